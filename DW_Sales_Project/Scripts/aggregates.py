@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Incrementally Maintained Dashboard Aggregates
+
+The dashboard runs the "USEFUL QUERIES FOR ANALYSIS" of database_schema_and_data.sql,
+each of which scans and joins the whole Sales table. Here every FactSales batch is
+folded into small rollup tables (summary, monthly, region x channel, category,
+product, customer, salesperson) with additive upserts, in the same transaction as
+the batch itself. DASHBOARD_QUERIES answer the original questions from these rollups,
+so a refresh costs the same whatever the size of the sales history.
+
+Categories are taken from the current DimProduct row when a sale is loaded.
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import compact_keys
+import warehouse
+
+
+AGGREGATE_TABLES = ['AggSalesSummary', 'AggSalesMonthly', 'AggSalesRegionChannel', 'AggSalesCategory',
+                    'AggSalesProduct', 'AggSalesCustomer', 'AggSalesEmployee']
+
+# The analysis queries of database_schema_and_data.sql, answered from the rollups
+# (1.0 * forces real division: SQLite stores whole-number DECIMAL sums as integers)
+DASHBOARD_QUERIES = {
+    'sales_summary': """
+        SELECT TransactionCount AS TotalTransactions,
+               Revenue AS TotalRevenue,
+               1.0 * Revenue / TransactionCount AS AvgTransactionValue,
+               FirstDateKey AS FirstSale,
+               LastDateKey AS LastSale
+        FROM AggSalesSummary""",
+    'top_products': """
+        SELECT p.ProductName, p.Category,
+               a.UnitsSold AS TotalSold,
+               a.Revenue,
+               1.0 * a.UnitPriceSum / a.TransactionCount AS AvgPrice
+        FROM AggSalesProduct a
+        JOIN DimProduct p ON p.ProductKey = a.ProductKey AND p.IsCurrent = 1
+        ORDER BY a.Revenue DESC
+        LIMIT 10""",
+    'monthly_trend': """
+        SELECT Year, Month,
+               TransactionCount,
+               Revenue AS MonthlyRevenue,
+               1.0 * Revenue / TransactionCount AS AvgTransactionValue
+        FROM AggSalesMonthly
+        ORDER BY Year, Month""",
+    'customer_lifetime_value': """
+        SELECT c.CustomerKey AS CustomerID, c.FullName, c.City, c.MembershipLevel,
+               COALESCE(a.PurchaseCount, 0) AS PurchaseCount,
+               a.TotalSpent,
+               1.0 * a.TotalSpent / a.PurchaseCount AS AvgOrderValue,
+               a.LastDateKey AS LastPurchase
+        FROM DimCustomer c
+        LEFT JOIN AggSalesCustomer a ON a.CustomerKey = c.CustomerKey
+        WHERE c.IsCurrent = 1
+        ORDER BY a.TotalSpent DESC""",
+    'salesperson_performance': """
+        SELECT e.EmployeeKey AS EmployeeID, e.FullName, e.Department,
+               COALESCE(a.SalesCount, 0) AS SalesCount,
+               a.TotalSales,
+               1.0 * a.TotalSales / a.SalesCount AS AvgSaleValue
+        FROM DimEmployee e
+        LEFT JOIN AggSalesEmployee a ON a.EmployeeKey = e.EmployeeKey
+        WHERE e.Department = 'Sales'
+        ORDER BY a.TotalSales DESC""",
+    'region_channel': """
+        SELECT Region, SalesChannel,
+               TransactionCount,
+               Revenue,
+               1.0 * Revenue / TransactionCount AS AvgValue
+        FROM AggSalesRegionChannel
+        ORDER BY Revenue DESC""",
+    'category_performance': """
+        SELECT p.Category,
+               p.ProductCount,
+               COALESCE(a.UnitsSold, 0) AS TotalUnitsSold,
+               a.Revenue AS TotalRevenue,
+               1.0 * a.Revenue / a.TransactionCount AS AvgSaleValue
+        FROM (SELECT Category, COUNT(*) AS ProductCount FROM DimProduct
+              WHERE IsCurrent = 1 GROUP BY Category) p
+        LEFT JOIN AggSalesCategory a ON a.Category = p.Category
+        ORDER BY a.Revenue DESC""",
+}
+
+
+def category_lookup(conn):
+    """Category code (compact_keys.ENUMS['Category']) by ProductKey code of the current DimProduct rows, -1 when unknown."""
+    pairs = conn.execute("SELECT ProductKey, Category FROM DimProduct WHERE IsCurrent = 1").fetchall()
+    if not pairs:
+        return np.full(1, -1, dtype=np.int8)
+    products, categories = zip(*pairs)
+    product_codes = compact_keys.PRODUCT.parse(products)
+    lookup = np.full(max(product_codes.max(), 0) + 1, -1, dtype=np.int8)
+    valid = product_codes >= 0
+    lookup[product_codes[valid]] = compact_keys.encode_enum('Category', categories).codes[valid]
+    return lookup
+
+
+def _upsert(conn, table, frame, keys, merge):
+    """Merge grouped deltas into a rollup: 'sum' measures add up, 'min'/'max' keep the extreme (NULLs ignored).
+
+    Key codes and enum categoricals are turned back into strings only here, at the write.
+    """
+    frame = compact_keys.expand_frame(frame)
+    columns = keys + list(merge)
+    updates = ', '.join(f"{col} = {col} + excluded.{col}" if rule == 'sum'
+                        else f"{col} = {rule.upper()}(COALESCE({col}, excluded.{col}), "
+                             f"COALESCE(excluded.{col}, {col}))"
+                        for col, rule in merge.items())
+    conn.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT({', '.join(keys)}) DO UPDATE SET {updates}",
+        frame[columns].to_numpy(object).tolist())
+
+
+def apply_batch(conn, facts, categories):
+    """Fold a batch of new FactSales rows into the rollups.
+
+    facts is a compact fact frame (incremental_load.fact_frame): int32 key codes and
+    DateKey with -1 for NULL, fixed categoricals for the enum columns. categories is the
+    category_lookup() array. Runs inside the caller's transaction, so the rollups commit
+    together with the batch.
+    """
+    if not len(facts):
+        return
+    dated = facts[facts['DateKey'] >= 0].copy()
+    dated['Year'] = dated['DateKey'] // 10000
+    dated['Month'] = dated['DateKey'] // 100 % 100
+    product_codes = facts['ProductKey'].to_numpy()
+    known = (product_codes >= 0) & (product_codes < len(categories))
+    category_codes = np.where(known, categories[np.where(known, product_codes, 0)], -1)
+    # Code -1 picks the trailing 'Unknown'
+    df = facts.assign(Category=np.append(np.asarray(compact_keys.ENUMS['Category'], dtype=object),
+                                      'Unknown')[category_codes])
+
+    summary = pd.DataFrame({'SummaryKey': [1], 'TransactionCount': [len(df)],
+                            'Revenue': [df['TotalAmount'].sum()],
+                            'FirstDateKey': [int(dated['DateKey'].min()) if len(dated) else None],
+                            'LastDateKey': [int(dated['DateKey'].max()) if len(dated) else None]})
+    _upsert(conn, 'AggSalesSummary', summary, ['SummaryKey'],
+            {'TransactionCount': 'sum', 'Revenue': 'sum', 'FirstDateKey': 'min', 'LastDateKey': 'max'})
+
+    monthly = dated.groupby(['Year', 'Month'], as_index=False).agg(
+        TransactionCount=('SalesKey', 'size'), Revenue=('TotalAmount', 'sum'))
+    _upsert(conn, 'AggSalesMonthly', monthly, ['Year', 'Month'],
+            {'TransactionCount': 'sum', 'Revenue': 'sum'})
+
+    region_channel = df.groupby(['Region', 'SalesChannel'], as_index=False, observed=True).agg(
+        TransactionCount=('SalesKey', 'size'), Revenue=('TotalAmount', 'sum'))
+    _upsert(conn, 'AggSalesRegionChannel', region_channel, ['Region', 'SalesChannel'],
+            {'TransactionCount': 'sum', 'Revenue': 'sum'})
+
+    category = df.groupby('Category', as_index=False).agg(
+        TransactionCount=('SalesKey', 'size'), UnitsSold=('Quantity', 'sum'), Revenue=('TotalAmount', 'sum'))
+    _upsert(conn, 'AggSalesCategory', category, ['Category'],
+            {'TransactionCount': 'sum', 'UnitsSold': 'sum', 'Revenue': 'sum'})
+
+    # Key rollups group on the int32 codes; -1 (NULL key) rows are left out
+    product = df[df['ProductKey'] >= 0].groupby('ProductKey', as_index=False).agg(
+        TransactionCount=('SalesKey', 'size'), UnitsSold=('Quantity', 'sum'),
+        Revenue=('TotalAmount', 'sum'), UnitPriceSum=('UnitPrice', 'sum'))
+    _upsert(conn, 'AggSalesProduct', product, ['ProductKey'],
+            {'TransactionCount': 'sum', 'UnitsSold': 'sum', 'Revenue': 'sum', 'UnitPriceSum': 'sum'})
+
+    customer = df[df['CustomerKey'] >= 0].groupby('CustomerKey', as_index=False).agg(
+        PurchaseCount=('SalesKey', 'size'), TotalSpent=('TotalAmount', 'sum'), LastDateKey=('DateKey', 'max'))
+    customer['LastDateKey'] = customer['LastDateKey'].astype(object).where(customer['LastDateKey'] >= 0, None)
+    _upsert(conn, 'AggSalesCustomer', customer, ['CustomerKey'],
+            {'PurchaseCount': 'sum', 'TotalSpent': 'sum', 'LastDateKey': 'max'})
+
+    employee = df[df['EmployeeKey'] >= 0].groupby('EmployeeKey', as_index=False).agg(
+        SalesCount=('SalesKey', 'size'), TotalSales=('TotalAmount', 'sum'))
+    _upsert(conn, 'AggSalesEmployee', employee, ['EmployeeKey'],
+            {'SalesCount': 'sum', 'TotalSales': 'sum'})
+
+
+def rebuild(conn, batch_size=100000):
+    """Recompute every rollup from FactSales (backfill of an existing warehouse)."""
+    for table in AGGREGATE_TABLES:
+        conn.execute(f"DELETE FROM {table}")
+    categories = category_lookup(conn)
+    cursor = conn.execute(f"SELECT {', '.join(warehouse.FACT_COLUMNS)} FROM FactSales ORDER BY SalesKey")
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        facts = compact_keys.compact_frame(pd.DataFrame(batch, columns=warehouse.FACT_COLUMNS))
+        facts['DateKey'] = facts['DateKey'].fillna(-1).astype(np.int32)
+        apply_batch(conn, facts, categories)
+    conn.commit()
+
+
+def run_query(conn, name):
+    """Column names and rows of a dashboard query."""
+    cursor = conn.execute(DASHBOARD_QUERIES[name])
+    return [col[0] for col in cursor.description], cursor.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain and query the dashboard aggregate tables')
+    parser.add_argument('warehouse', help='Warehouse database path (SQLite)')
+    parser.add_argument('--rebuild', action='store_true', help='Recompute the aggregates from FactSales')
+    parser.add_argument('--query', choices=list(DASHBOARD_QUERIES), help='Print a dashboard query')
+
+    args = parser.parse_args()
+
+    conn = warehouse.connect(args.warehouse)
+    try:
+        if args.rebuild:
+            rebuild(conn)
+            print("Aggregates rebuilt from FactSales")
+        if args.query:
+            columns, rows = run_query(conn, args.query)
+            print('\t'.join(columns))
+            for row in rows:
+                print('\t'.join('' if value is None else str(value) for value in row))
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Compact Key and Enum Encoding
+
+Every business key of the project is a prefix plus a zero-padded number ('C001',
+'EMP042', 'MOV00017', ...). In memory these are kept as int32 codes and only turned
+back into strings at the I/O edges (files, SQL scripts, warehouse VARCHAR columns).
+Low-cardinality text columns use fixed dictionaries so their int8 codes are the same
+in every batch and every process.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+
+INT32_MAX = np.iinfo(np.int32).max
+
+
+class KeyFormat:
+    """Formatting and parsing between 'PREFIX000' keys and int32 codes."""
+
+    def __init__(self, prefix, width):
+        self.prefix = prefix
+        self.width = width
+        self._pattern = f"^{re.escape(prefix)}([0-9]+)$"
+
+    def format_one(self, code):
+        return f"{self.prefix}{code:0{self.width}d}"
+
+    def format(self, codes):
+        """Key strings for an array of codes."""
+        codes = np.asarray(codes)
+        return (self.prefix + pd.Series(codes, copy=False).astype(str).str.zfill(self.width)).to_numpy(object)
+
+    def parse(self, keys):
+        """int32 codes for an array of key strings; -1 for nulls and malformed keys.
+
+        Only keys exactly as format() writes them are accepted: 'C1', 'C0001', 'C1.5'
+        or 'C 1' are not 'C001', and codes above the int32 range are rejected.
+        """
+        keys = pd.Series(np.asarray(keys, dtype=object), copy=False)
+        digits = keys.str.extract(self._pattern, expand=False)
+        # At most 10 digits, so the number fits in int64 before the int32 range check
+        numbers = pd.to_numeric(digits.where(digits.str.len() <= 10), errors='coerce')
+        codes = numbers.where(numbers <= INT32_MAX).fillna(-1).to_numpy(np.int64)
+        # Zero padding must be exactly the one format() writes
+        canonical = self.format(np.maximum(codes, 0)) == keys.to_numpy(object)
+        return np.where((codes >= 0) & canonical, codes, -1).astype(np.int32)
+
+
+CUSTOMER = KeyFormat('C', 3)
+PRODUCT = KeyFormat('P', 3)
+EMPLOYEE = KeyFormat('EMP', 3)
+SUPPLIER = KeyFormat('SUP', 3)
+MOVEMENT = KeyFormat('MOV', 5)
+CAMPAIGN = KeyFormat('MKT', 3)
+
+# Key format of every key column, by column name
+KEY_COLUMNS = {
+    'CustomerID': CUSTOMER, 'CustomerKey': CUSTOMER,
+    'ProductID': PRODUCT, 'ProductKey': PRODUCT,
+    'EmployeeID': EMPLOYEE, 'EmployeeKey': EMPLOYEE, 'SalespersonID': EMPLOYEE, 'ManagerID': EMPLOYEE,
+    'SupplierID': SUPPLIER, 'SupplierKey': SUPPLIER,
+    'MovementID': MOVEMENT,
+    'CampaignID': CAMPAIGN,
+}
+
+# Fixed dictionaries of the enum columns (same order as in datagenerator.py)
+ENUMS = {
+    'SalesChannel': ['Online', 'In-Store', 'Phone', 'Mobile App'],
+    'PaymentMethod': ['Credit Card', 'Debit Card', 'Cash', 'PayPal', 'Bank Transfer'],
+    'Region': ['North', 'South', 'East', 'West', 'Central'],
+    'Category': ['Electronics', 'Accessories', 'Stationery', 'Home & Garden', 'Books', 'Clothing',
+                 'Sports', 'Food & Beverages'],
+    'MovementType': ['Purchase', 'Sale', 'Return', 'Adjustment', 'Transfer', 'Damaged'],
+    'Location': ['Warehouse A', 'Warehouse B', 'Store 1', 'Store 2', 'Online Fulfillment'],
+}
+
+
+def enum_dtype(name):
+    """Categorical dtype with the fixed dictionary of an enum column.
+
+    Casting to it turns unknown values into NaN; convert through encode_enum.
+    """
+    return pd.CategoricalDtype(ENUMS[name])
+
+
+def encode_enum(name, values):
+    """Categorical column whose codes follow the fixed dictionary of the enum.
+
+    Raises ValueError for values missing from the dictionary instead of turning them
+    into NaN; extend ENUMS to accept a new value.
+    """
+    values = pd.Series(np.asarray(values, dtype=object), copy=False)
+    unknown = pd.unique(values[values.notna() & ~values.isin(ENUMS[name])])
+    if len(unknown):
+        raise ValueError(f"{name} values not in compact_keys.ENUMS['{name}']: "
+                         f"{', '.join(sorted(map(str, unknown)))}")
+    return pd.Categorical(values, dtype=enum_dtype(name))
+
+
+def encode_keys(name, values):
+    """int32 codes of a key column (-1 for nulls).
+
+    Raises ValueError for keys that are not in the format of the column instead of
+    turning them into -1, so a malformed key cannot be loaded as NULL.
+    """
+    key_format = KEY_COLUMNS[name]
+    values = pd.Series(np.asarray(values, dtype=object), copy=False)
+    codes = key_format.parse(values)
+    malformed = pd.unique(values[(codes < 0) & values.notna().to_numpy()])
+    if len(malformed):
+        raise ValueError(f"{name} values not in the {key_format.format_one(1)} key format: "
+                         f"{', '.join(sorted(map(str, malformed))[:5])}")
+    return codes
+
+
+def decode_enum(name, codes):
+    """Enum strings for an array of dictionary codes."""
+    return np.asarray(ENUMS[name], dtype=object)[np.asarray(codes)]
+
+
+def compact_frame(df):
+    """Replace the key columns of a frame by int32 codes and its enum columns by fixed categoricals."""
+    df = df.copy()
+    for col in df.columns:
+        if col in KEY_COLUMNS:
+            df[col] = KEY_COLUMNS[col].parse(df[col])
+        elif col in ENUMS:
+            df[col] = encode_enum(col, df[col].astype(object))
+    return df
+
+
+def expand_frame(df):
+    """Inverse of compact_frame, for writing a frame back out."""
+    df = df.copy()
+    for col in df.columns:
+        if col in KEY_COLUMNS and pd.api.types.is_integer_dtype(df[col]):
+            codes = df[col].to_numpy()
+            keys = KEY_COLUMNS[col].format(codes)
+            keys[codes < 0] = None
+            df[col] = keys
+        elif col in ENUMS:
+            df[col] = df[col].astype(object).where(df[col].notna(), None)
+    return df
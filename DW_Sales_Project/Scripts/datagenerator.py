@@ -8,6 +8,8 @@ import random
 import yaml
 import csv
 
+import compact_keys
+
 # Set random seed for reproducibility
 np.random.seed(42)
 random.seed(42)
@@ -15,11 +17,11 @@ random.seed(42)
 # ========================================
 # 1. PRODUCTS DATA (CSV) - Enhanced
 # ========================================
-categories = ['Electronics', 'Accessories', 'Stationery', 'Home & Garden', 'Books', 'Clothing', 'Sports', 'Food & Beverages']
+categories = compact_keys.ENUMS['Category']
 suppliers = ['Dell', 'Sony', 'Apple', 'Samsung', 'Logitech', 'Microsoft', 'HP', 'Canon', 'Nike', 'Adidas', 'Staples', 'IKEA']
 
 product_data = pd.DataFrame({
-    "ProductID": [f"P{str(i).zfill(3)}" for i in range(1, 101)],
+    "ProductID": compact_keys.PRODUCT.format(np.arange(1, 101)),
     "ProductName": [
         "Laptop", "Wireless Headphones", "Notebook", "Gaming Mouse", "Smartphone", "Tablet", "Monitor", 
         "Keyboard", "Webcam", "Printer", "Router", "External HDD", "USB Cable", "Power Bank", "Bluetooth Speaker",
@@ -46,37 +48,47 @@ end_date = datetime(2024, 12, 31)
 date_range = pd.date_range(start=start_date, end=end_date, freq='D')
 
 # Generate sales data for SQL INSERT statements (not saving as CSV)
-sales_records = []
-sale_id = 1001
-
-for _ in range(5000):  # Generate 5000 sales records for SQL
-    sale_date = random.choice(date_range)
-    customer_id = f"C{random.randint(1, 500):03d}"
-    product_id = f"P{random.randint(1, 100):03d}"
+# Sales are kept column-wise with compact codes: int32 keys, int8 enum codes and an
+# index into date_range. Key and enum strings are only produced when writing the SQL.
+n_sales = 5000  # Generate 5000 sales records for SQL
+sale_ids = np.arange(1001, 1001 + n_sales, dtype=np.int32)
+sale_date_idx = np.empty(n_sales, dtype=np.int32)
+sale_customer = np.empty(n_sales, dtype=np.int32)
+sale_product = np.empty(n_sales, dtype=np.int32)
+sale_quantity = np.empty(n_sales, dtype=np.int32)
+sale_unit_price = np.empty(n_sales, dtype=np.float64)
+sale_discount = np.empty(n_sales, dtype=np.float64)
+sale_total = np.empty(n_sales, dtype=np.float64)
+sale_channel = np.empty(n_sales, dtype=np.int8)
+sale_payment = np.empty(n_sales, dtype=np.int8)
+sale_salesperson = np.empty(n_sales, dtype=np.int32)
+sale_region = np.empty(n_sales, dtype=np.int8)
+
+# Unit price by product code (index 0 unused) instead of a DataFrame filter per sale
+unit_price_by_product = np.concatenate(([np.nan], product_data['UnitPrice'].to_numpy()))
+n_channels = len(compact_keys.ENUMS['SalesChannel'])
+n_payments = len(compact_keys.ENUMS['PaymentMethod'])
+n_regions = len(compact_keys.ENUMS['Region'])
+
+# randrange(n) draws the same numbers as random.choice on an n-item list
+for i in range(n_sales):
+    sale_date_idx[i] = random.randrange(len(date_range))
+    sale_customer[i] = random.randint(1, 500)
+    sale_product[i] = random.randint(1, 100)
     quantity = random.randint(1, 10)
-    # Get unit price from product data
-    unit_price = product_data[product_data['ProductID'] == product_id]['UnitPrice'].iloc[0] if not product_data[product_data['ProductID'] == product_id].empty else random.uniform(10, 500)
+    unit_price = unit_price_by_product[sale_product[i]]
     discount = round(random.uniform(0, 0.3), 2)
-    sales_channel = random.choice(['Online', 'In-Store', 'Phone', 'Mobile App'])
-    payment_method = random.choice(['Credit Card', 'Debit Card', 'Cash', 'PayPal', 'Bank Transfer'])
-    
-    sales_records.append({
-        'SaleID': sale_id,
-        'SaleDate': sale_date.strftime('%Y-%m-%d'),
-        'CustomerID': customer_id,
-        'ProductID': product_id,
-        'Quantity': quantity,
-        'UnitPrice': round(unit_price, 2),
-        'Discount': discount,
-        'TotalAmount': round(quantity * unit_price * (1 - discount), 2),
-        'SalesChannel': sales_channel,
-        'PaymentMethod': payment_method,
-        'SalespersonID': f"EMP{random.randint(1, 50):03d}",
-        'Region': random.choice(['North', 'South', 'East', 'West', 'Central'])
-    })
-    sale_id += 1
+    sale_channel[i] = random.randrange(n_channels)
+    sale_payment[i] = random.randrange(n_payments)
+    sale_salesperson[i] = random.randint(1, 50)
+    sale_region[i] = random.randrange(n_regions)
+
+    sale_quantity[i] = quantity
+    sale_unit_price[i] = round(unit_price, 2)
+    sale_discount[i] = discount
+    sale_total[i] = round(quantity * unit_price * (1 - discount), 2)
 
-# Keep as list for SQL generation, not DataFrame
+# Keep as columns for SQL generation, not DataFrame
 
 # ========================================
 # 3. CUSTOMERS DATA (JSON) - Enhanced
@@ -97,7 +109,7 @@ customers_data = {
 for i in range(1, 501):
     signup_date = start_date + timedelta(days=random.randint(0, (end_date - start_date).days))
     customer = {
-        "CustomerID": f"C{i:03d}",
+        "CustomerID": compact_keys.CUSTOMER.format_one(i),
         "PersonalInfo": {
             "FirstName": random.choice(first_names),
             "LastName": random.choice(last_names),
@@ -138,7 +150,7 @@ campaign_goals = ['Brand Awareness', 'Lead Generation', 'Sales', 'Customer Reten
 for i in range(1, 51):
     campaign = ET.SubElement(campaigns_element, "Campaign")
     
-    ET.SubElement(campaign, "CampaignID").text = f"MKT{i:03d}"
+    ET.SubElement(campaign, "CampaignID").text = compact_keys.CAMPAIGN.format_one(i)
     ET.SubElement(campaign, "Name").text = f"Campaign {i} - {random.choice(campaign_goals)}"
     ET.SubElement(campaign, "Type").text = random.choice(campaign_types)
     ET.SubElement(campaign, "StartDate").text = (start_date + timedelta(days=random.randint(0, 500))).strftime('%Y-%m-%d')
@@ -173,7 +185,7 @@ employees_data = {
 for i in range(1, 101):
     hire_date = start_date + timedelta(days=random.randint(-1095, 365))  # 3 years back to 1 year forward
     employee = {
-        'employee_id': f"EMP{i:03d}",
+        'employee_id': compact_keys.EMPLOYEE.format_one(i),
         'personal_info': {
             'first_name': random.choice(first_names),
             'last_name': random.choice(last_names),
@@ -185,7 +197,7 @@ for i in range(1, 101):
             'position': random.choice(positions),
             'hire_date': hire_date.strftime('%Y-%m-%d'),
             'salary': round(random.uniform(25000, 120000), 2),
-            'manager_id': f"EMP{random.randint(1, 20):03d}" if i > 20 else None
+            'manager_id': compact_keys.EMPLOYEE.format_one(random.randint(1, 20)) if i > 20 else None
         },
         'performance': {
             'last_review_date': (hire_date + timedelta(days=365)).strftime('%Y-%m-%d'),
@@ -198,16 +210,16 @@ for i in range(1, 101):
 # ========================================
 # 6. INVENTORY MOVEMENTS (TSV) - New
 # ========================================
-movement_types = ['Purchase', 'Sale', 'Return', 'Adjustment', 'Transfer', 'Damaged']
-locations = ['Warehouse A', 'Warehouse B', 'Store 1', 'Store 2', 'Online Fulfillment']
+movement_types = compact_keys.ENUMS['MovementType']
+locations = compact_keys.ENUMS['Location']
 
 inventory_movements = []
 for i in range(2000):
     movement_date = start_date + timedelta(days=random.randint(0, 730))
     inventory_movements.append({
-        'MovementID': f"MOV{i+1:05d}",
+        'MovementID': compact_keys.MOVEMENT.format_one(i + 1),
         'Date': movement_date.strftime('%Y-%m-%d'),
-        'ProductID': f"P{random.randint(1, 100):03d}",
+        'ProductID': compact_keys.PRODUCT.format_one(random.randint(1, 100)),
         'MovementType': random.choice(movement_types),
         'Quantity': random.randint(-50, 100),  # Negative for outgoing
         'Location': random.choice(locations),
@@ -223,7 +235,7 @@ inventory_df = pd.DataFrame(inventory_movements)
 supplier_details = []
 for i, supplier in enumerate(suppliers, 1):
     supplier_details.append({
-        'SupplierID': f"SUP{i:03d}",
+        'SupplierID': compact_keys.SUPPLIER.format_one(i),
         'CompanyName': supplier,
         'ContactPerson': f"{random.choice(first_names)} {random.choice(last_names)}",
         'Email': f"contact@{supplier.lower().replace(' ', '')}.com",
@@ -414,16 +426,21 @@ CREATE TABLE MarketingCampaigns (
 );
 
 -- =====================================================
--- COMPLETE SALES DATA - {len(sales_records)} RECORDS
+-- COMPLETE SALES DATA - {n_sales} RECORDS
 -- =====================================================
 
--- Insert all {len(sales_records)} sales records
+-- Insert all {n_sales} sales records
 INSERT INTO Sales (SaleID, SaleDate, CustomerID, ProductID, Quantity, UnitPrice, Discount, TotalAmount, SalesChannel, PaymentMethod, SalespersonID, Region) VALUES"""
 
-# Add all sales records as INSERT statements
+# Expand the compact sales columns into INSERT rows (keys and enums formatted here only)
+sale_dates = date_range.strftime('%Y-%m-%d')[sale_date_idx]
 sales_inserts = []
-for record in sales_records:
-    insert_line = f"({record['SaleID']}, '{record['SaleDate']}', '{record['CustomerID']}', '{record['ProductID']}', {record['Quantity']}, {record['UnitPrice']}, {record['Discount']}, {record['TotalAmount']}, '{record['SalesChannel']}', '{record['PaymentMethod']}', '{record['SalespersonID']}', '{record['Region']}')"
+for sale_id, sale_date, customer_id, product_id, quantity, unit_price, discount, total, channel, payment, salesperson_id, region in zip(
+        sale_ids.tolist(), sale_dates, compact_keys.CUSTOMER.format(sale_customer), compact_keys.PRODUCT.format(sale_product),
+        sale_quantity.tolist(), sale_unit_price.tolist(), sale_discount.tolist(), sale_total.tolist(),
+        compact_keys.decode_enum('SalesChannel', sale_channel), compact_keys.decode_enum('PaymentMethod', sale_payment),
+        compact_keys.EMPLOYEE.format(sale_salesperson), compact_keys.decode_enum('Region', sale_region)):
+    insert_line = f"({sale_id}, '{sale_date}', '{customer_id}', '{product_id}', {quantity}, {unit_price}, {discount}, {total}, '{channel}', '{payment}', '{salesperson_id}', '{region}')"
     sales_inserts.append(insert_line)
 
 # Join all inserts with commas and add to SQL script
@@ -582,7 +599,7 @@ print("   📁 suppliers_and_analytics.xlsx  - Multi-sheet Excel with analytics"
 print("   📁 database_schema_and_data.sql  - Complete database schema + 5,000 SALES RECORDS")
 print("\n📈 Data Statistics:")
 print(f"   • Products: {len(product_data)} items across {len(categories)} categories")
-print(f"   • Sales: {len(sales_records)} transactions (SQL-ONLY) worth ${sum(record['TotalAmount'] for record in sales_records):,.2f}")
+print(f"   • Sales: {n_sales} transactions (SQL-ONLY) worth ${sum(sale_total.tolist()):,.2f}")
 print(f"   • Customers: {len(customers_data['customers'])} from {len(moroccan_cities)} cities")
 print(f"   • Campaigns: 50 marketing campaigns with performance metrics")
 print(f"   • Employees: 100 staff across {len(departments)} departments")
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Date Dimension Builder
+
+Generates DimDate for a whole calendar range with numpy date arithmetic instead of the
+per-row script component of DFT_Load_DimDate: YYYYMMDD DateKey, year, quarter, month,
+ISO year/week, weekday, fiscal year/quarter/period and a holiday flag.
+
+DateIndex replaces the per-row date Lookup of the fact loads. The calendar is
+contiguous, so a date resolves to its DateKey by indexing an array with its day
+offset, and a DateKey resolves to its dimension row through a direct-index array over
+the key range. The same index serves SaleDate, LastRestocked, SignupDate or any other
+date column.
+"""
+
+import argparse
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import warehouse
+
+
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September',
+               'October', 'November', 'December']
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Holidays falling on the same day every year, as MMDD
+FIXED_HOLIDAYS = {101: "New Year's Day", 501: 'Labour Day', 1225: 'Christmas Day'}
+
+# First month of the fiscal year (1 = fiscal year is the calendar year)
+FISCAL_YEAR_START_MONTH = 1
+
+DIM_DATE_COLUMNS = ['DateKey', 'Date', 'Year', 'Quarter', 'Month', 'Day', 'MonthName', 'DayName', 'WeekOfYear',
+                    'IsWeekend', 'ISOYear', 'DayOfWeek', 'FiscalYear', 'FiscalQuarter', 'FiscalPeriod', 'IsHoliday']
+
+
+def to_days(values):
+    """datetime64[D] array for datetime64 values or 'YYYY-MM-DD...' strings (NaT for nulls)."""
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        return values.astype('datetime64[D]')
+    values = np.where(pd.isna(values), 'NaT', values.astype(object))
+    # Keep the date part of datetime strings, then parse in numpy
+    return values.astype('U10').astype('datetime64[D]')
+
+
+def date_keys_of(days):
+    """int32 YYYYMMDD keys of a datetime64[D] array."""
+    months = days.astype('datetime64[M]')
+    years = months.astype('datetime64[Y]').astype(np.int64) + 1970
+    month = months.astype(np.int64) % 12 + 1
+    day = (days - months).astype(np.int64) + 1
+    return (years * 10000 + month * 100 + day).astype(np.int32)
+
+
+def build_calendar(start, end, fiscal_start_month=FISCAL_YEAR_START_MONTH, holidays=()):
+    """DimDate rows for every day from start to end inclusive, as a DataFrame in DIM_DATE_COLUMNS order."""
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    months = days.astype('datetime64[M]')
+    year = months.astype('datetime64[Y]').astype(np.int64) + 1970
+    month = months.astype(np.int64) % 12 + 1
+    day = (days - months).astype(np.int64) + 1
+    # 1970-01-01 was a Thursday; 0 = Monday
+    weekday = (days.astype(np.int64) + 3) % 7
+
+    # ISO 8601: a week belongs to the year of its Thursday
+    thursday = days + (3 - weekday)
+    iso_year_start = thursday.astype('datetime64[Y]')
+    iso_year = iso_year_start.astype(np.int64) + 1970
+    iso_week = (thursday - iso_year_start.astype('datetime64[D]')).astype(np.int64) // 7 + 1
+
+    fiscal_period = (month - fiscal_start_month) % 12 + 1
+    # Fiscal years are named after the calendar year they end in
+    fiscal_year = year + ((month >= fiscal_start_month) & (fiscal_start_month != 1))
+
+    date_key = (year * 10000 + month * 100 + day).astype(np.int32)
+    is_holiday = np.isin(month * 100 + day, list(FIXED_HOLIDAYS))
+    if len(holidays):
+        is_holiday |= np.isin(date_key, date_keys_of(to_days(holidays)))
+
+    return pd.DataFrame({
+        'DateKey': date_key,
+        'Date': np.datetime_as_string(days, unit='D'),
+        'Year': year,
+        'Quarter': (month - 1) // 3 + 1,
+        'Month': month,
+        'Day': day,
+        'MonthName': np.asarray(MONTH_NAMES, dtype=object)[month - 1],
+        'DayName': np.asarray(DAY_NAMES, dtype=object)[weekday],
+        'WeekOfYear': iso_week,
+        'IsWeekend': weekday >= 5,
+        'ISOYear': iso_year,
+        'DayOfWeek': weekday + 1,
+        'FiscalYear': fiscal_year,
+        'FiscalQuarter': (fiscal_period - 1) // 3 + 1,
+        'FiscalPeriod': fiscal_period,
+        'IsHoliday': is_holiday,
+    })
+
+
+class DateIndex:
+    """Direct-index arrays over a contiguous calendar: day offset -> DateKey, DateKey -> row."""
+
+    def __init__(self, first_day, date_keys):
+        self.first_day = np.datetime64(first_day, 'D')
+        self.date_keys = np.asarray(date_keys, dtype=np.int32)
+        self.first_key = int(self.date_keys[0])
+        # YYYYMMDD keys are not contiguous (no day 32), so gaps hold -1
+        self.rows = np.full(int(self.date_keys[-1]) - self.first_key + 1, -1, dtype=np.int32)
+        self.rows[self.date_keys - self.first_key] = np.arange(len(self.date_keys), dtype=np.int32)
+
+    @classmethod
+    def from_calendar(cls, calendar):
+        return cls(calendar['Date'].iloc[0], calendar['DateKey'].to_numpy())
+
+    def keys_for(self, dates):
+        """DateKeys of an array of dates; -1 for nulls and dates outside the calendar."""
+        dates = np.asarray(dates)
+        if dates.dtype.kind != 'M':
+            # Strings: parse each distinct date once, then spread the keys back over the rows
+            codes, uniques = pd.factorize(dates.astype(object))
+            keys = np.append(self.keys_for(to_days(uniques)), np.int32(-1))
+            return keys[codes]
+        offsets = (dates.astype('datetime64[D]') - self.first_day).astype(np.int64)
+        inside = (offsets >= 0) & (offsets < len(self.date_keys))
+        return np.where(inside, self.date_keys[np.where(inside, offsets, 0)], -1).astype(np.int32)
+
+    def rows_for(self, date_keys):
+        """Calendar row positions of an array of DateKeys; -1 for unknown keys."""
+        offsets = np.asarray(date_keys, dtype=np.int64) - self.first_key
+        inside = (offsets >= 0) & (offsets < len(self.rows))
+        return np.where(inside, self.rows[np.where(inside, offsets, 0)], -1)
+
+
+def ensure_calendar(conn, first_date, last_date, fiscal_start_month=FISCAL_YEAR_START_MONTH, holidays=()):
+    """Extend DimDate to whole years covering first_date..last_date and its existing rows.
+
+    Only missing dates are written. With no dates (None), the existing calendar or the
+    current year is used.
+    Returns the DateIndex of the resulting calendar.
+    """
+    low, high = conn.execute("SELECT MIN(Date), MAX(Date) FROM DimDate").fetchone()
+    if first_date is None or last_date is None:
+        first_date = last_date = low or date.today().isoformat()
+    start = np.datetime64(str(first_date)[:4] + '-01-01', 'D')
+    end = np.datetime64(str(last_date)[:4] + '-12-31', 'D')
+    if low is not None:
+        start = min(start, np.datetime64(low[:10], 'D'))
+        end = max(end, np.datetime64(high[:10], 'D'))
+
+    calendar = build_calendar(start, end, fiscal_start_month, holidays)
+    existing = [row[0] for row in conn.execute("SELECT DateKey FROM DimDate")]
+    missing = calendar[~np.isin(calendar['DateKey'].to_numpy(), existing)]
+    conn.executemany(
+        f"INSERT INTO DimDate ({', '.join(DIM_DATE_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * len(DIM_DATE_COLUMNS))})",
+        missing.to_numpy(object).tolist())
+    conn.commit()
+    return DateIndex.from_calendar(calendar)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or extend the DimDate calendar of the warehouse')
+    parser.add_argument('warehouse', help='Warehouse database path (SQLite)')
+    parser.add_argument('--start', required=True, help='First date (YYYY-MM-DD), extended to January 1')
+    parser.add_argument('--end', required=True, help='Last date (YYYY-MM-DD), extended to December 31')
+    parser.add_argument('--fiscal-start-month', type=int, default=FISCAL_YEAR_START_MONTH,
+                        help='First month of the fiscal year')
+    parser.add_argument('--holiday', action='append', default=[], help='Extra holiday date (repeatable)')
+
+    args = parser.parse_args()
+
+    conn = warehouse.connect(args.warehouse)
+    try:
+        index = ensure_calendar(conn, args.start, args.end, args.fiscal_start_month, args.holiday)
+    except ValueError as e:
+        print(f"Invalid date: {e}")
+        return 1
+    finally:
+        conn.close()
+    print(f"DimDate covers {index.date_keys[0]} to {index.date_keys[-1]} ({len(index.date_keys)} days)")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Incremental Warehouse Loader
+
+Replaces the 'SQL - Truncate Staging Tables' full reload of the SSIS package with an
+incremental load:
+  - dimension rows are compared through a hash of their attributes and only new or
+    changed rows are written (Type 1 overwrite or Type 2 history rows),
+  - FactSales only receives source Sales rows above the stored SaleID watermark,
+  - watermarks are persisted in ETL_State so each run resumes where the last stopped,
+  - the dashboard rollups of aggregates.py are updated from each new FactSales batch.
+The dimension loads run concurrently through scheduler.DAGScheduler; FactSales waits
+for all of them and the success log waits for FactSales.
+"""
+
+import argparse
+import hashlib
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import aggregates
+import compact_keys
+import date_dimension
+import ingestion
+import integrity_check
+import warehouse
+from scheduler import DAGScheduler, TaskFailedError
+from stage_metrics import MetricsRecorder
+
+
+# Dimension definitions: business key, tracked attributes and slowly changing type
+DIMENSIONS = {
+    'DimCustomer': {
+        'key': 'CustomerKey',
+        'columns': ['FullName', 'Email', 'City', 'SignupDate', 'Status', 'MembershipLevel'],
+        'scd_type': 2,
+    },
+    'DimProduct': {
+        'key': 'ProductKey',
+        'columns': ['ProductName', 'Category', 'Supplier', 'UnitPrice', 'MinStockLevel',
+                    'Weight_kg', 'Dimensions', 'WarrantyMonths'],
+        'scd_type': 2,
+    },
+    'DimEmployee': {
+        'key': 'EmployeeKey',
+        'columns': ['FullName', 'Email', 'Department', 'Position'],
+        'scd_type': 1,
+    },
+    'DimSupplier': {
+        'key': 'SupplierKey',
+        'columns': ['CompanyName', 'Country', 'PaymentTerms', 'Rating', 'YearsPartnership'],
+        'scd_type': 1,
+    },
+}
+
+SOURCE_SALES_COLUMNS = ['SaleID', 'SaleDate', 'CustomerID', 'ProductID', 'Quantity', 'UnitPrice', 'Discount',
+                        'TotalAmount', 'SalesChannel', 'PaymentMethod', 'SalespersonID', 'Region']
+
+SOURCE_SALES_QUERY = f"""
+SELECT {', '.join(SOURCE_SALES_COLUMNS)}
+FROM Sales
+WHERE SaleID > ?
+ORDER BY SaleID
+"""
+
+
+# ========================================
+# EXTRACT (typed frames from the ingestion layer)
+# ========================================
+
+def _records(df, columns):
+    """Plain Python rows from a typed frame, with dates rendered as 'YYYY-MM-DD'."""
+    data = {}
+    for target, source in columns.items():
+        series = df[source]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            series = series.dt.strftime('%Y-%m-%d')
+        data[target] = series.tolist()
+    return [dict(zip(data, values)) for values in zip(*data.values())]
+
+
+def extract_customers(data_dir):
+    """DimCustomer rows from customers_database.json."""
+    df = ingestion.read_customers(data_dir)
+    df['FullName'] = df['FirstName'] + ' ' + df['LastName']
+    return _records(df, {'CustomerKey': 'CustomerID', 'FullName': 'FullName', 'Email': 'Email',
+                         'City': 'City', 'SignupDate': 'SignupDate', 'Status': 'Status',
+                         'MembershipLevel': 'MembershipLevel'})
+
+
+def extract_products(data_dir):
+    """DimProduct rows from products_inventory.csv."""
+    df = ingestion.read_products(data_dir)
+    return _records(df, {'ProductKey': 'ProductID', **{col: col for col in DIMENSIONS['DimProduct']['columns']}})
+
+
+def extract_employees(data_dir):
+    """DimEmployee rows from employees_directory.yaml."""
+    df = ingestion.read_employees(data_dir)
+    df['FullName'] = df['FirstName'] + ' ' + df['LastName']
+    return _records(df, {'EmployeeKey': 'EmployeeID', 'FullName': 'FullName', 'Email': 'Email',
+                         'Department': 'Department', 'Position': 'Position'})
+
+
+def extract_suppliers(data_dir):
+    """DimSupplier rows from suppliers_and_analytics.xml (output of exltoxml.py)."""
+    df = ingestion.read_suppliers(data_dir)
+    return _records(df, {'SupplierKey': 'supplierid', 'CompanyName': 'companyname', 'Country': 'country',
+                         'PaymentTerms': 'paymentterms', 'Rating': 'rating',
+                         'YearsPartnership': 'yearspartnership'})
+
+
+EXTRACTORS = {
+    'DimCustomer': extract_customers,
+    'DimProduct': extract_products,
+    'DimEmployee': extract_employees,
+    'DimSupplier': extract_suppliers,
+}
+
+
+# ========================================
+# DIMENSIONS
+# ========================================
+
+def row_hash(row, columns):
+    """Hash of the tracked attributes, used to detect changed dimension rows."""
+    payload = '\x1f'.join('' if row[col] is None else str(row[col]) for col in columns)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def current_hashes(conn, table):
+    """Business key -> RowHash of the current version of every dimension row."""
+    spec = DIMENSIONS[table]
+    query = f"SELECT {spec['key']}, RowHash FROM {table}"
+    if spec['scd_type'] == 2:
+        query += " WHERE IsCurrent = 1"
+    return dict(conn.execute(query).fetchall())
+
+
+def version_start(run_time, previous_start):
+    """ValidFrom of a new SCD2 version: run_time, or one microsecond after the start of the
+    version it replaces when that is not earlier (two loads within the same second)."""
+    if previous_start < run_time:
+        return run_time
+    start = datetime.fromisoformat(previous_start) + timedelta(microseconds=1)
+    return start.isoformat(sep=' ', timespec='microseconds')
+
+
+def load_dimension(conn, table, rows, run_time):
+    """Apply new and changed rows to a dimension. Returns per-action row counts."""
+    spec = DIMENSIONS[table]
+    key, columns = spec['key'], spec['columns']
+    existing = current_hashes(conn, table)
+
+    inserts, changes = [], []
+    for row in rows:
+        digest = row_hash(row, columns)
+        previous = existing.get(row[key])
+        if previous is None:
+            inserts.append((row, digest))
+        elif previous != digest:
+            changes.append((row, digest))
+
+    if spec['scd_type'] == 2:
+        # Close the current version, then add the new one as a fresh history row; ValidFrom
+        # is part of the primary key, so it must move past the start of the closed version
+        starts = dict(conn.execute(f"SELECT {key}, ValidFrom FROM {table} WHERE IsCurrent = 1")) if changes else {}
+        changed = [(row, digest, version_start(run_time, starts[row[key]])) for row, digest in changes]
+        conn.executemany(
+            f"UPDATE {table} SET ValidTo = ?, IsCurrent = 0 WHERE {key} = ? AND IsCurrent = 1",
+            [(valid_from, row[key]) for row, _, valid_from in changed])
+        insert_cols = [key] + columns + ['RowHash', 'ValidFrom', 'IsCurrent']
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(insert_cols)}) VALUES ({', '.join('?' * len(insert_cols))})",
+            [tuple(row[c] for c in [key] + columns) + (digest, valid_from, 1)
+             for row, digest, valid_from in [(row, digest, run_time) for row, digest in inserts] + changed])
+    else:
+        assignments = ', '.join(f"{col} = ?" for col in columns + ['RowHash'])
+        conn.executemany(
+            f"UPDATE {table} SET {assignments} WHERE {key} = ?",
+            [tuple(row[c] for c in columns) + (digest, row[key]) for row, digest in changes])
+        insert_cols = [key] + columns + ['RowHash']
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(insert_cols)}) VALUES ({', '.join('?' * len(insert_cols))})",
+            [tuple(row[c] for c in [key] + columns) + (digest,) for row, digest in inserts])
+
+    return {'inserted': len(inserts), 'changed': len(changes),
+            'unchanged': len(rows) - len(inserts) - len(changes)}
+
+
+# ========================================
+# FACT
+# ========================================
+
+def get_watermark(conn, table):
+    """Highest source key already loaded into a table (0 before the first run)."""
+    row = conn.execute("SELECT Watermark FROM ETL_State WHERE TableName = ?", (table,)).fetchone()
+    return row[0] if row and row[0] is not None else 0
+
+
+def set_watermark(conn, table, watermark, rows_loaded, log_id):
+    """Persist the watermark of a table after a successful batch."""
+    conn.execute(
+        """INSERT INTO ETL_State (TableName, Watermark, RowsLoaded, LastLogID, UpdatedAt)
+           VALUES (?, ?, ?, ?, ?)
+           ON CONFLICT(TableName) DO UPDATE SET
+               Watermark = excluded.Watermark,
+               RowsLoaded = ETL_State.RowsLoaded + excluded.RowsLoaded,
+               LastLogID = excluded.LastLogID,
+               UpdatedAt = excluded.UpdatedAt""",
+        (table, watermark, rows_loaded, log_id, warehouse.now()))
+
+
+def supplier_lookup(conn):
+    """SupplierKey code by ProductKey code (-1 when unknown), through DimProduct.Supplier."""
+    pairs = conn.execute(
+        """SELECT p.ProductKey, s.SupplierKey
+           FROM DimProduct p JOIN DimSupplier s ON s.CompanyName = p.Supplier
+           WHERE p.IsCurrent = 1""").fetchall()
+    if not pairs:
+        return np.full(1, -1, dtype=np.int32)
+    products, suppliers = zip(*pairs)
+    product_codes = compact_keys.PRODUCT.parse(products)
+    lookup = np.full(max(product_codes.max(), 0) + 1, -1, dtype=np.int32)
+    valid = product_codes >= 0
+    lookup[product_codes[valid]] = compact_keys.SUPPLIER.parse(suppliers)[valid]
+    return lookup
+
+
+def fact_frame(batch, suppliers, dates):
+    """Compact FactSales frame for a batch of source Sales rows, computed column-wise.
+
+    Keys are int32 compact_keys codes, the enum columns fixed categoricals and DateKey
+    an int32 (-1 for NULL in all key columns); fact_records() formats it for the INSERT.
+    suppliers is the supplier_lookup() array and dates the date_dimension.DateIndex.
+    Raises ValueError for malformed keys, unknown enum values and dates outside the calendar.
+    """
+    source = pd.DataFrame.from_records(batch, columns=SOURCE_SALES_COLUMNS)
+
+    # NULL SaleDate -> NULL DateKey; any other date must be in the calendar ensure_calendar built
+    sale_dates = source['SaleDate'].to_numpy(object)
+    date_keys = dates.keys_for(sale_dates)
+    outside = (date_keys == -1) & source['SaleDate'].notna().to_numpy()
+    if outside.any():
+        raise ValueError(f"SaleDate outside the DimDate calendar: "
+                         f"{', '.join(sorted({str(d) for d in sale_dates[outside]})[:5])}")
+    # SupplierKey resolved by indexing the lookup array with the product code
+    product_codes = compact_keys.encode_keys('ProductID', source['ProductID'])
+    known = (product_codes >= 0) & (product_codes < len(suppliers))
+    supplier_codes = np.where(known, suppliers[np.where(known, product_codes, 0)], -1).astype(np.int32)
+    # Same expression as the SSIS ADDRevenue derived column
+    revenue = (source['Quantity'].to_numpy(np.float64) * source['UnitPrice'].to_numpy(np.float64)
+               - source['Discount'].to_numpy(np.float64))
+
+    return pd.DataFrame({
+        'SalesKey': source['SaleID'],
+        'DateKey': date_keys,
+        'CustomerKey': compact_keys.encode_keys('CustomerID', source['CustomerID']),
+        'ProductKey': product_codes,
+        'EmployeeKey': compact_keys.encode_keys('SalespersonID', source['SalespersonID']),
+        'SupplierKey': supplier_codes,
+        'Quantity': source['Quantity'],
+        'UnitPrice': source['UnitPrice'],
+        'Discount': source['Discount'],
+        'TotalAmount': source['TotalAmount'],
+        'Revenue': revenue,
+        'SalesChannel': compact_keys.encode_enum('SalesChannel', source['SalesChannel']),
+        'PaymentMethod': compact_keys.encode_enum('PaymentMethod', source['PaymentMethod']),
+        'Region': compact_keys.encode_enum('Region', source['Region']),
+    })
+
+
+def fact_records(facts):
+    """INSERT rows (tuples in warehouse.FACT_COLUMNS order) of a fact_frame(); keys become strings here."""
+    df = compact_keys.expand_frame(facts)
+    df['DateKey'] = df['DateKey'].astype(object).where(df['DateKey'] >= 0, None)
+    df = df[warehouse.FACT_COLUMNS].astype(object)
+    return list(df.where(df.notna(), None).itertuples(index=False, name=None))
+
+
+def load_fact_sales(conn, source_conn, log_id, batch_size=10000, cancel_event=None):
+    """Append the source Sales rows above the watermark to FactSales.
+
+    Batches are committed one by one, so a run cancelled through cancel_event keeps
+    the batches already loaded and the next run resumes after them.
+    """
+    watermark = get_watermark(conn, 'FactSales')
+    pending, first_date, last_date = source_conn.execute(
+        "SELECT COUNT(*), MIN(SaleDate), MAX(SaleDate) FROM Sales WHERE SaleID > ?", (watermark,)).fetchone()
+    if pending == 0:
+        return 0
+    # DimDate is extended once for the whole load; batches resolve DateKeys by array indexing
+    dates = date_dimension.ensure_calendar(conn, first_date, last_date)
+    suppliers = supplier_lookup(conn)
+    categories = aggregates.category_lookup(conn)
+    placeholders = ', '.join('?' * len(warehouse.FACT_COLUMNS))
+    total = 0
+
+    cursor = source_conn.execute(SOURCE_SALES_QUERY, (watermark,))
+    while True:
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        facts = fact_frame(batch, suppliers, dates)
+        conn.executemany(f"INSERT INTO FactSales ({', '.join(warehouse.FACT_COLUMNS)}) VALUES ({placeholders})",
+                         fact_records(facts))
+        aggregates.apply_batch(conn, facts, categories)
+        # Watermark and rollups move in the same transaction as the rows they cover
+        set_watermark(conn, 'FactSales', batch[-1][0], len(batch), log_id)
+        conn.commit()
+        total += len(batch)
+
+    return total
+
+
+# ========================================
+# RUN
+# ========================================
+
+def reset_warehouse(conn):
+    """Empty every warehouse table and watermark (the old full reload behaviour)."""
+    for table in ['FactSales', 'DimEmployee', 'DimSupplier', 'DimProduct', 'DimCustomer', 'DimDate',
+                  'ETL_State'] + aggregates.AGGREGATE_TABLES:
+        conn.execute(f"DELETE FROM {table}")
+    conn.commit()
+
+
+def build_schedule(warehouse_path, source_path, data_dir, log_id, recorder,
+                   batch_size=10000, max_workers=4, check_integrity=False):
+    """DAG of the load: dimensions in parallel, then FactSales, then the success log.
+
+    With check_integrity the pending Sales rows are validated against the loaded
+    dimensions before FactSales runs, and orphan keys fail the run.
+    """
+    scheduler = DAGScheduler(max_workers)
+    run_time = warehouse.now()
+
+    def dimension_task(table):
+        def task():
+            with recorder.stage(f"{table}:extract") as metrics:
+                rows = EXTRACTORS[table](data_dir)
+                metrics.rows_read = len(rows)
+            conn = warehouse.connect(warehouse_path)
+            try:
+                with recorder.stage(f"{table}:load") as metrics:
+                    counts = load_dimension(conn, table, rows, run_time)
+                    conn.commit()
+                    metrics.rows_read = len(rows)
+                    metrics.rows_written = counts['inserted'] + counts['changed']
+            finally:
+                conn.close()
+            print(f"{table}: {counts['inserted']} inserted, {counts['changed']} changed, "
+                  f"{counts['unchanged']} unchanged")
+        return task
+
+    def fact_task():
+        conn = warehouse.connect(warehouse_path)
+        source_conn = sqlite3.connect(source_path)
+        try:
+            with recorder.stage('FactSales:load') as metrics:
+                rows = load_fact_sales(conn, source_conn, log_id, batch_size, scheduler.cancel_event)
+                metrics.rows_read = metrics.rows_written = rows
+            print(f"FactSales: {rows} new rows (watermark {get_watermark(conn, 'FactSales')})")
+        finally:
+            source_conn.close()
+            conn.close()
+
+    def integrity_task():
+        conn = warehouse.connect(warehouse_path)
+        source_conn = sqlite3.connect(source_path)
+        try:
+            with recorder.stage('IntegrityCheck') as metrics:
+                reports = integrity_check.check_pending_sales(conn, source_conn, get_watermark(conn, 'FactSales'))
+                metrics.rows_read = sum(report.rows for report in reports)
+                metrics.rows_rejected = sum(report.orphan_rows for report in reports)
+        finally:
+            source_conn.close()
+            conn.close()
+        failed = [report for report in reports if not report.ok]
+        if failed:
+            raise ValueError("Orphan foreign keys in pending Sales rows:\n" +
+                             "\n".join(integrity_check.format_report(report) for report in failed))
+
+    def success_task():
+        conn = warehouse.connect(warehouse_path)
+        try:
+            warehouse.complete_process_log(conn, log_id)
+        finally:
+            conn.close()
+
+    for table in EXTRACTORS:
+        scheduler.add_task(table, dimension_task(table))
+    fact_dependencies = list(EXTRACTORS)
+    if check_integrity:
+        scheduler.add_task('IntegrityCheck', integrity_task, depends_on=list(EXTRACTORS))
+        fact_dependencies.append('IntegrityCheck')
+    scheduler.add_task('FactSales', fact_task, depends_on=fact_dependencies)
+    scheduler.add_task('UpdateSuccessLog', success_task, depends_on=['FactSales'])
+    return scheduler
+
+
+def run(warehouse_path, source_path, data_dir, full=False, batch_size=10000, max_workers=4,
+        recorder=None, check_integrity=False):
+    """Run one incremental (or full) load and log it in ETL_ProcessLog."""
+    recorder = recorder or MetricsRecorder()
+    conn = warehouse.connect(warehouse_path)
+    log_id = warehouse.start_process_log(conn)
+    recorder.log_id = log_id
+    scheduler = build_schedule(warehouse_path, source_path, data_dir, log_id, recorder,
+                               batch_size, max_workers, check_integrity)
+    try:
+        if full:
+            reset_warehouse(conn)
+        scheduler.run()
+        return True
+    except (TaskFailedError, sqlite3.Error) as e:
+        warehouse.fail_process_log(conn, log_id, str(e))
+        print(f"Error: ETL process encountered an error: {e}")
+        return False
+    finally:
+        path, seconds = scheduler.critical_path()
+        warehouse.log_task_runs(conn, log_id, scheduler.runs, path)
+        recorder.save(conn, log_id)
+        recorder.export()
+        for line in recorder.summary():
+            print(line)
+        if path:
+            print(f"Critical path: {' -> '.join(path)} ({seconds:.2f}s)")
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incrementally load the sales data warehouse')
+    parser.add_argument('warehouse', help='Warehouse database path (SQLite)')
+    parser.add_argument('source', help='Source TechMartDB database path holding the Sales table (SQLite)')
+    parser.add_argument('--data-dir', default=ingestion.DEFAULT_DATA_DIR,
+                        help='Folder containing the dimension source files (default: ../DataSources)')
+    parser.add_argument('--full', action='store_true', help='Empty the warehouse and reload everything')
+    parser.add_argument('--batch-size', type=int, default=10000, help='FactSales rows per transaction')
+    parser.add_argument('--max-workers', type=int, default=4, help='Maximum number of tasks running at once')
+    parser.add_argument('--check-integrity', action='store_true',
+                        help='Validate the foreign keys of pending Sales rows before loading FactSales')
+    parser.add_argument('--metrics-dir', help='Folder for the JSON/Prometheus stage metrics and profiles')
+    parser.add_argument('--profile', action='append', default=[], metavar='STAGE',
+                        help='Run cProfile for a stage, e.g. FactSales:load (repeatable)')
+    parser.add_argument('--trace-memory', action='append', default=[], metavar='STAGE',
+                        help='Measure the Python heap peak of a stage with tracemalloc (repeatable)')
+
+    args = parser.parse_args()
+
+    recorder = MetricsRecorder(args.metrics_dir, args.profile, args.trace_memory)
+    ok = run(args.warehouse, args.source, args.data_dir, args.full, args.batch_size, args.max_workers,
+             recorder, args.check_integrity)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Source Ingestion Layer
+
+One fast reader per DataSources format, all returning typed pandas DataFrames
+(categorical dtypes for low-cardinality columns, datetime64 for dates):
+  - CSV / TSV : pandas C engine with explicit dtypes
+  - JSON      : orjson when installed, json otherwise
+  - YAML      : libyaml CSafeLoader when available
+  - XML       : ElementTree.iterparse, clearing elements as they are consumed
+  - XLSX      : openpyxl in read-only mode
+
+ingest() runs the readers concurrently (thread or process pool) so the extract
+phase takes as long as the slowest file rather than the sum of all of them.
+"""
+
+import argparse
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import pandas as pd
+import yaml
+
+import compact_keys
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'DataSources')
+
+
+def _typed(df, dtypes=None, dates=(), categories=()):
+    """Apply explicit dtypes, date parsing and categorical encoding to a frame."""
+    if dtypes:
+        df = df.astype(dtypes)
+    for col in dates:
+        df[col] = pd.to_datetime(df[col], format='%Y-%m-%d')
+    for col in categories:
+        df[col] = df[col].astype('category')
+    return df
+
+
+def _enums(df, columns):
+    """Encode columns with the fixed compact_keys dictionaries (ValueError on unknown values)."""
+    for col in columns:
+        df[col] = compact_keys.encode_enum(col, df[col])
+    return df
+
+
+def _iter_records(path, tag):
+    """Flat dicts of the <tag> elements of an XML file, one nesting level inlined."""
+    for _, elem in ET.iterparse(path, events=('end',)):
+        if elem.tag != tag:
+            continue
+        record = {}
+        for child in elem:
+            if len(child):
+                for grandchild in child:
+                    record[grandchild.tag] = grandchild.text
+            else:
+                record[child.tag] = child.text
+        yield record
+        elem.clear()
+
+
+# ========================================
+# READERS
+# ========================================
+
+def read_products(data_dir):
+    """products_inventory.csv"""
+    df = pd.read_csv(
+        os.path.join(data_dir, 'products_inventory.csv'),
+        engine='c',
+        dtype={'ProductID': str, 'ProductName': str, 'Category': str,
+               'Supplier': 'category',
+               'UnitPrice': 'float64', 'StockLevel': 'int32', 'MinStockLevel': 'int32',
+               'Discontinued': bool, 'Weight_kg': 'float64', 'Dimensions': str, 'WarrantyMonths': 'int16'},
+        parse_dates=['LastRestocked'], date_format='%Y-%m-%d')
+    return _enums(df, ['Category'])
+
+
+def read_inventory_movements(data_dir):
+    """inventory_movements.tsv"""
+    df = pd.read_csv(
+        os.path.join(data_dir, 'inventory_movements.tsv'),
+        sep='\t',
+        engine='c',
+        dtype={'MovementID': str, 'ProductID': str, 'MovementType': str,
+               'Quantity': 'int32', 'Location': str, 'Reference': str, 'Notes': 'category'},
+        parse_dates=['Date'], date_format='%Y-%m-%d')
+    return _enums(df, ['MovementType', 'Location'])
+
+
+def read_customers(data_dir):
+    """customers_database.json, flattened to one row per customer."""
+    with open(os.path.join(data_dir, 'customers_database.json'), 'rb') as f:
+        raw = f.read()
+    customers = (orjson.loads(raw) if orjson else json.loads(raw))['customers']
+    df = pd.DataFrame({
+        'CustomerID': [c['CustomerID'] for c in customers],
+        'FirstName': [c['PersonalInfo']['FirstName'] for c in customers],
+        'LastName': [c['PersonalInfo']['LastName'] for c in customers],
+        'Email': [c['PersonalInfo']['Email'] for c in customers],
+        'Phone': [c['PersonalInfo']['Phone'] for c in customers],
+        'DateOfBirth': [c['PersonalInfo']['DateOfBirth'] for c in customers],
+        'City': [c['Address']['City'] for c in customers],
+        'PostalCode': [c['Address']['PostalCode'] for c in customers],
+        'Street': [c['Address']['Street'] for c in customers],
+        'SignupDate': [c['AccountInfo']['SignupDate'] for c in customers],
+        'Status': [c['AccountInfo']['Status'] for c in customers],
+        'MembershipLevel': [c['AccountInfo']['MembershipLevel'] for c in customers],
+        'TotalPurchases': [c['AccountInfo']['TotalPurchases'] for c in customers],
+        'LastPurchaseDate': [c['AccountInfo']['LastPurchaseDate'] for c in customers],
+        'PreferredLanguage': [c['Preferences']['PreferredLanguage'] for c in customers],
+    })
+    return _typed(df, {'TotalPurchases': 'float64'},
+                  dates=['DateOfBirth', 'SignupDate', 'LastPurchaseDate'],
+                  categories=['City', 'Status', 'MembershipLevel', 'PreferredLanguage'])
+
+
+def read_employees(data_dir):
+    """employees_directory.yaml, flattened to one row per employee."""
+    with open(os.path.join(data_dir, 'employees_directory.yaml'), encoding='utf-8') as f:
+        employees = yaml.load(f, Loader=YamlLoader)['employees']
+    df = pd.DataFrame({
+        'EmployeeID': [e['employee_id'] for e in employees],
+        'FirstName': [e['personal_info']['first_name'] for e in employees],
+        'LastName': [e['personal_info']['last_name'] for e in employees],
+        'Email': [e['personal_info']['email'] for e in employees],
+        'Phone': [e['personal_info']['phone'] for e in employees],
+        'Department': [e['job_info']['department'] for e in employees],
+        'Position': [e['job_info']['position'] for e in employees],
+        'HireDate': [e['job_info']['hire_date'] for e in employees],
+        'Salary': [e['job_info']['salary'] for e in employees],
+        'ManagerID': [e['job_info']['manager_id'] for e in employees],
+        'LastReviewDate': [e['performance']['last_review_date'] for e in employees],
+        'Rating': [e['performance']['rating'] for e in employees],
+        'GoalsMet': [e['performance']['goals_met'] for e in employees],
+    })
+    return _typed(df, {'Salary': 'float64', 'Rating': 'float64', 'GoalsMet': 'int16'},
+                  dates=['HireDate', 'LastReviewDate'],
+                  categories=['Department', 'Position'])
+
+
+def read_marketing_campaigns(data_dir):
+    """marketing_campaigns.xml, Performance metrics inlined."""
+    df = pd.DataFrame(list(_iter_records(os.path.join(data_dir, 'marketing_campaigns.xml'), 'Campaign')))
+    return _typed(df, {'Budget': 'float64', 'Impressions': 'int32', 'Clicks': 'int32',
+                       'ClickRate': 'float64', 'Conversions': 'int32', 'ConversionRate': 'float64',
+                       'Cost': 'float64'},
+                  dates=['StartDate', 'EndDate'],
+                  categories=['Type', 'TargetAudience'])
+
+
+def read_suppliers(data_dir):
+    """suppliers_and_analytics.xml (the exltoxml.py export of the Suppliers sheet)."""
+    df = pd.DataFrame(list(_iter_records(os.path.join(data_dir, 'suppliers_and_analytics.xml'), 'record')))
+    return _typed(df, {'rating': 'float64', 'yearspartnership': 'int16'},
+                  dates=['lastorderdate'],
+                  categories=['country', 'paymentterms'])
+
+
+def read_suppliers_workbook(data_dir, sheet='Suppliers'):
+    """One sheet of suppliers_and_analytics.xlsx."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(os.path.join(data_dir, 'suppliers_and_analytics.xlsx'),
+                             read_only=True, data_only=True)
+    try:
+        rows = workbook[sheet].iter_rows(values_only=True)
+        header = next(rows)
+        df = pd.DataFrame(list(rows), columns=header)
+    finally:
+        workbook.close()
+    if sheet == 'Suppliers':
+        df = _typed(df, {'Rating': 'float64', 'YearsPartnership': 'int16'},
+                    dates=['LastOrderDate'],
+                    categories=['Country', 'PaymentTerms'])
+    return df
+
+
+READERS = {
+    'products': read_products,
+    'inventory_movements': read_inventory_movements,
+    'customers': read_customers,
+    'employees': read_employees,
+    'marketing_campaigns': read_marketing_campaigns,
+    'suppliers': read_suppliers,
+    'suppliers_workbook': read_suppliers_workbook,
+}
+
+
+def read_source(name, data_dir=DEFAULT_DATA_DIR):
+    """Read one named source into a typed DataFrame."""
+    if name not in READERS:
+        raise ValueError(f"Unknown source '{name}', expected one of: {', '.join(READERS)}")
+    return READERS[name](data_dir)
+
+
+def _timed_read(name, data_dir, compact=False):
+    start = time.perf_counter()
+    df = read_source(name, data_dir)
+    if compact:
+        df = compact_keys.compact_frame(df)
+    return df, time.perf_counter() - start
+
+
+def ingest(data_dir=DEFAULT_DATA_DIR, sources=None, max_workers=None, use_processes=False, timings=None,
+           compact=False):
+    """Read several sources concurrently. Returns name -> DataFrame.
+
+    Pass a dict as timings to receive the read time of every source in seconds. With
+    compact, key columns are int32 codes and enum columns use the fixed dictionaries
+    of compact_keys.
+    """
+    names = list(sources or READERS)
+    pool = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with pool(max_workers=max_workers or len(names)) as executor:
+        futures = {name: executor.submit(_timed_read, name, data_dir, compact) for name in names}
+        tables = {}
+        for name, future in futures.items():
+            tables[name], seconds = future.result()
+            if timings is not None:
+                timings[name] = seconds
+    return tables
+
+
+def to_arrow(tables):
+    """Convert ingested frames to pyarrow Tables (categoricals become dictionary arrays)."""
+    if pa is None:
+        raise ImportError("pyarrow is required for Arrow output: pip install pyarrow")
+    return {name: pa.Table.from_pandas(df, preserve_index=False) for name, df in tables.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read every data source concurrently into typed tables')
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help='Folder containing the source files')
+    parser.add_argument('--source', action='append', choices=list(READERS), help='Source to read (repeatable, default: all)')
+    parser.add_argument('--workers', type=int, help='Pool size (default: one per source)')
+    parser.add_argument('--processes', action='store_true', help='Use a process pool instead of threads')
+    parser.add_argument('--compact', action='store_true', help='Encode keys as int32 codes')
+
+    args = parser.parse_args()
+
+    timings = {}
+    start = time.perf_counter()
+    tables = ingest(args.data_dir, args.source, args.workers, args.processes, timings, args.compact)
+    total = time.perf_counter() - start
+
+    for name, df in tables.items():
+        memory_kb = df.memory_usage(deep=True).sum() / 1024
+        print(f"{name:22s} {len(df):7d} rows  {timings[name]:.3f}s  {memory_kb:,.0f} KB")
+    print(f"Total wall time: {total:.3f}s (sum of reads {sum(timings.values()):.3f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Referential Integrity Checker
+
+Validates every foreign key of the source data before the warehouse load, so the
+load can run with its constraints enabled instead of 'NOCHECK CONSTRAINT ALL'.
+
+Each parent key column is indexed once. Keys in the compact_keys formats become a
+presence bitmap over their int32 codes, so a child chunk is checked by array indexing.
+Other keys get a hash index; child chunks are factorized, only their distinct values
+are probed and orphan rows are counted with a bincount. At 100M fact rows the cost is
+one pass over each foreign key column.
+"""
+
+import argparse
+import json
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import compact_keys
+import ingestion
+
+
+# (child table, child column, parent table, parent column), as declared in the DDL
+RELATIONSHIPS = [
+    ('Sales', 'CustomerID', 'Customers', 'CustomerID'),
+    ('Sales', 'ProductID', 'Products', 'ProductID'),
+    ('Sales', 'SalespersonID', 'Employees', 'EmployeeID'),
+    ('InventoryMovements', 'ProductID', 'Products', 'ProductID'),
+    ('Employees', 'ManagerID', 'Employees', 'EmployeeID'),
+    ('Products', 'SupplierID', 'Suppliers', 'SupplierID'),
+]
+
+
+class OrphanReport:
+    """Outcome of checking one foreign key."""
+
+    def __init__(self, child, child_column, parent, parent_column):
+        self.relationship = f"{child}.{child_column} -> {parent}.{parent_column}"
+        self.rows = 0
+        self.nulls = 0
+        self.orphan_rows = 0
+        self.orphan_keys = {}
+
+    @property
+    def ok(self):
+        return self.orphan_rows == 0
+
+    def samples(self, size=5):
+        """Most frequent orphan keys with their row counts."""
+        return sorted(self.orphan_keys.items(), key=lambda item: (-item[1], str(item[0])))[:size]
+
+    def as_dict(self, sample_size=5):
+        return {'relationship': self.relationship, 'rows': self.rows, 'nulls': self.nulls,
+                'orphan_rows': self.orphan_rows, 'distinct_orphan_keys': len(self.orphan_keys),
+                'samples': [{'key': key, 'rows': count} for key, count in self.samples(sample_size)]}
+
+
+class IntegrityChecker:
+    def __init__(self):
+        self.indexes = {}
+
+    def add_keys(self, table, column, values, key_format=None):
+        """Index a parent key column.
+
+        With a compact_keys.KeyFormat the keys become a presence bitmap over their int
+        codes, so child lookups are plain array indexing; otherwise a hash index is used.
+        """
+        values = np.asarray(values, dtype=object)
+        if key_format is not None:
+            codes = key_format.parse(values)
+            if len(codes) and (codes >= 0).all():
+                present = np.zeros(codes.max() + 1, dtype=bool)
+                present[codes] = True
+                self.indexes[(table, column)] = (key_format, present)
+                return
+        self.indexes[(table, column)] = (None, pd.Index(pd.unique(values)))
+
+    def check(self, child, child_column, parent, parent_column, chunks):
+        """Count the rows of a child column whose value is missing from the parent index.
+
+        Chunks are arrays of key strings, or of int codes (-1 for null) when the parent
+        was indexed with a key format.
+        """
+        key_format, index = self.indexes[(parent, parent_column)]
+        report = OrphanReport(child, child_column, parent, parent_column)
+        for chunk in chunks:
+            if key_format is not None:
+                self._check_codes(report, key_format, index, chunk)
+            else:
+                self._check_hashed(report, index, np.asarray(chunk, dtype=object))
+        return report
+
+    @staticmethod
+    def _check_hashed(report, index, chunk):
+        codes, uniques = pd.factorize(chunk)
+        report.rows += len(codes)
+        report.nulls += int((codes == -1).sum())
+        missing = np.flatnonzero(index.get_indexer(uniques) == -1)
+        if len(missing) == 0:
+            return
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        report.orphan_rows += int(counts[missing].sum())
+        for position in missing:
+            key = uniques[position]
+            report.orphan_keys[key] = report.orphan_keys.get(key, 0) + int(counts[position])
+
+    @staticmethod
+    def _check_codes(report, key_format, present, chunk):
+        chunk = np.asarray(chunk)
+        if not np.issubdtype(chunk.dtype, np.integer):
+            # Parse only the distinct strings of the chunk, then test their codes
+            row_codes, uniques = pd.factorize(chunk.astype(object))
+            codes = key_format.parse(uniques)
+            orphan = ~((codes >= 0) & (codes < len(present)) & present[np.clip(codes, 0, len(present) - 1)])
+            report.rows += len(row_codes)
+            report.nulls += int((row_codes == -1).sum())
+            if orphan.any():
+                counts = np.bincount(row_codes[row_codes >= 0], minlength=len(uniques))
+                report.orphan_rows += int(counts[orphan].sum())
+                for key, count in zip(uniques[orphan], counts[orphan]):
+                    report.orphan_keys[key] = report.orphan_keys.get(key, 0) + int(count)
+            return
+
+        nulls = chunk < 0
+        in_range = ~nulls & (chunk < len(present))
+        orphans = ~(in_range & present[np.where(in_range, chunk, 0)]) & ~nulls
+        report.rows += len(chunk)
+        report.nulls += int(nulls.sum())
+        orphan_count = int(orphans.sum())
+        if orphan_count:
+            report.orphan_rows += orphan_count
+            orphan_codes, counts = np.unique(chunk[orphans], return_counts=True)
+            for key, count in zip(key_format.format(orphan_codes), counts):
+                report.orphan_keys[key] = report.orphan_keys.get(key, 0) + int(count)
+
+
+# ========================================
+# COLUMN SOURCES
+# ========================================
+
+def db_column_chunks(conn, table, column, chunk_size=1_000_000, where='', params=()):
+    """A database column as a sequence of numpy arrays."""
+    cursor = conn.execute(f"SELECT {column} FROM {table} {where}", params)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield np.fromiter((row[0] for row in rows), dtype=object, count=len(rows))
+
+
+def file_columns(data_dir):
+    """(table, column) -> values for the tables available as DataSources files."""
+    tables = ingestion.ingest(data_dir, ['customers', 'products', 'employees', 'suppliers',
+                                         'inventory_movements'])
+    return {
+        ('Customers', 'CustomerID'): tables['customers']['CustomerID'].to_numpy(object),
+        ('Products', 'ProductID'): tables['products']['ProductID'].to_numpy(object),
+        # products_inventory.csv carries the supplier company name, not a SupplierID
+        ('Products', 'SupplierID'): tables['products']['Supplier'].astype(object).to_numpy(),
+        ('Employees', 'EmployeeID'): tables['employees']['EmployeeID'].to_numpy(object),
+        ('Employees', 'ManagerID'): tables['employees']['ManagerID'].to_numpy(object),
+        ('Suppliers', 'SupplierID'): tables['suppliers']['supplierid'].to_numpy(object),
+        ('InventoryMovements', 'ProductID'): tables['inventory_movements']['ProductID'].to_numpy(object),
+    }
+
+
+def run_checks(conn, files=None, chunk_size=1_000_000):
+    """Check every relationship; columns come from files when given, the database otherwise."""
+    files = files or {}
+
+    def chunks(table, column):
+        if (table, column) in files:
+            return [files[(table, column)]]
+        return db_column_chunks(conn, table, column, chunk_size)
+
+    checker = IntegrityChecker()
+    for parent, parent_column in {(rel[2], rel[3]) for rel in RELATIONSHIPS}:
+        values = [value for chunk in chunks(parent, parent_column) for value in chunk]
+        checker.add_keys(parent, parent_column, values, compact_keys.KEY_COLUMNS.get(parent_column))
+
+    return [checker.check(child, child_column, parent, parent_column, chunks(child, child_column))
+            for child, child_column, parent, parent_column in RELATIONSHIPS]
+
+
+def check_pending_sales(warehouse_conn, source_conn, watermark, chunk_size=1_000_000):
+    """Check the source Sales rows above the watermark against the current warehouse dimensions."""
+    checker = IntegrityChecker()
+    for table, key, where in [('DimCustomer', 'CustomerKey', "WHERE IsCurrent = 1"),
+                              ('DimProduct', 'ProductKey', "WHERE IsCurrent = 1"),
+                              ('DimEmployee', 'EmployeeKey', "")]:
+        checker.add_keys(table, key, [row[0] for row in warehouse_conn.execute(f"SELECT {key} FROM {table} {where}")],
+                         compact_keys.KEY_COLUMNS[key])
+
+    where = "WHERE SaleID > ?"
+    return [checker.check('Sales', column, parent, parent_column,
+                          db_column_chunks(source_conn, 'Sales', column, chunk_size, where, (watermark,)))
+            for column, parent, parent_column in [('CustomerID', 'DimCustomer', 'CustomerKey'),
+                                                  ('ProductID', 'DimProduct', 'ProductKey'),
+                                                  ('SalespersonID', 'DimEmployee', 'EmployeeKey')]]
+
+
+def format_report(report, sample_size=5):
+    status = 'OK' if report.ok else 'ORPHANS'
+    line = (f"[{status}] {report.relationship}: {report.rows} rows, {report.nulls} null, "
+            f"{report.orphan_rows} orphan rows, {len(report.orphan_keys)} distinct orphan keys")
+    if not report.ok:
+        line += "\n    e.g. " + ", ".join(f"{key} ({count})" for key, count in report.samples(sample_size))
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check foreign keys of the source data before loading')
+    parser.add_argument('source', help='Source TechMartDB database path (SQLite)')
+    parser.add_argument('--data-dir', help='Read Customers/Products/Employees/Suppliers/InventoryMovements '
+                                           'from the DataSources files instead of the database')
+    parser.add_argument('--chunk-size', type=int, default=1_000_000, help='Rows per chunk read from the database')
+    parser.add_argument('--samples', type=int, default=5, help='Orphan keys shown per relationship')
+    parser.add_argument('--json', help='Also write the report to this JSON file')
+
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.source)
+    try:
+        files = file_columns(args.data_dir) if args.data_dir else None
+        reports = run_checks(conn, files, args.chunk_size)
+    finally:
+        conn.close()
+
+    for report in reports:
+        print(format_report(report, args.samples))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([report.as_dict(args.samples) for report in reports], f, indent=2)
+
+    return 0 if all(report.ok for report in reports) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Fingerprinted Artifact Pipeline
+
+Rebuilds the generated data files only when something they depend on has changed:
+
+  datagenerator.py -> exltoxml.py (suppliers XML) -> xsdprovider.py (suppliers XSD)
+
+Every step declares its script, source files, parameters, input artifacts and output
+artifacts. A step's fingerprint is the content hash of all of them; it is skipped when
+the fingerprint and its outputs match the last run. Hashes are cached by file size and
+mtime, so an unchanged tree costs one stat() per file. Steps run as a DAG on the
+scheduler.py thread pool, so placing outputs overlaps with the remaining steps.
+
+Artifacts are built once in DW_Sales_Project/build/ and placed into DataSources/ and
+SSMS/ as hardlinks (copies only where the filesystem refuses links), as recorded in
+build/manifest.json. customers_database.json is therefore stored once for both folders.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+from scheduler import DAGScheduler, TaskFailedError
+
+
+ROOT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+STATE_FILE = '.pipeline_state.json'
+MANIFEST_FILE = 'manifest.json'
+
+
+class Step:
+    """A build step: a script run in the build folder with declared inputs and outputs.
+
+    sources are repository files (relative to the root) besides the script; inputs and
+    outputs are artifacts in the build folder.
+    """
+
+    def __init__(self, name, script, sources=(), params=(), inputs=(), outputs=()):
+        self.name = name
+        self.script = script
+        self.sources = list(sources)
+        self.params = list(params)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+
+
+GENERATED_FILES = ['products_inventory.csv', 'customers_database.json', 'employees_directory.yaml',
+                   'marketing_campaigns.xml', 'inventory_movements.tsv', 'suppliers_and_analytics.xlsx',
+                   'database_schema_and_data.sql']
+
+STEPS = [
+    Step('generate', 'DW_Sales_Project/Scripts/datagenerator.py',
+         sources=['DW_Sales_Project/Scripts/compact_keys.py'],
+         outputs=GENERATED_FILES),
+    Step('excel_to_xml', 'exltoxml.py',
+         inputs=['suppliers_and_analytics.xlsx'],
+         outputs=['suppliers_and_analytics.xml']),
+    Step('xml_to_xsd', 'DW_Sales_Project/Scripts/xsdprovider.py',
+         params=['suppliers_and_analytics.xml', '-o', 'suppliers_and_analytics.xsd'],
+         inputs=['suppliers_and_analytics.xml'],
+         outputs=['suppliers_and_analytics.xsd']),
+]
+
+# Where organize_project.sh puts each artifact (customers_database.json goes to both)
+PLACEMENTS = {
+    'DW_Sales_Project/DataSources': ['products_inventory.csv', 'customers_database.json',
+                                     'employees_directory.yaml', 'marketing_campaigns.xml',
+                                     'inventory_movements.tsv', 'suppliers_and_analytics.xlsx',
+                                     'suppliers_and_analytics.xml', 'suppliers_and_analytics.xsd'],
+    'DW_Sales_Project/SSMS': ['database_schema_and_data.sql', 'customers_database.json'],
+}
+
+
+class Pipeline:
+    def __init__(self, root_dir=ROOT_DIR, build_dir=None, steps=STEPS, placements=PLACEMENTS,
+                 force=False, max_workers=4):
+        self.root_dir = root_dir
+        self.build_dir = build_dir or os.path.join(root_dir, 'DW_Sales_Project', 'build')
+        self.steps = {step.name: step for step in steps}
+        self.placements = placements
+        self.force = force
+        self.max_workers = max_workers
+        self.results = {}
+        self._lock = threading.Lock()
+        self.state = self._load_state()
+
+    # ========================================
+    # STATE AND HASHING
+    # ========================================
+
+    def _load_state(self):
+        try:
+            with open(os.path.join(self.build_dir, STATE_FILE), encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        return {'files': state.get('files', {}), 'steps': state.get('steps', {}),
+                'placements': state.get('placements', {})}
+
+    def _save_state(self):
+        os.makedirs(self.build_dir, exist_ok=True)
+        path = os.path.join(self.build_dir, STATE_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=1, sort_keys=True)
+        os.replace(path + '.tmp', path)
+
+        manifest = {dest: {'source': entry['source'], 'sha256': entry['sha256'], 'mode': entry['mode']}
+                    for dest, entry in sorted(self.state['placements'].items())}
+        with open(os.path.join(self.build_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    def digest(self, path):
+        """SHA-256 of a file, reusing the cached value while its size and mtime are unchanged."""
+        stat = os.stat(path)
+        cached = self.state['files'].get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(block)
+        with self._lock:
+            self.state['files'][path] = [stat.st_size, stat.st_mtime_ns, sha.hexdigest()]
+        return sha.hexdigest()
+
+    def artifact(self, name):
+        return os.path.join(self.build_dir, name)
+
+    def fingerprint(self, step):
+        """Content hash of everything that determines the outputs of a step."""
+        declared = {
+            'script': self.digest(os.path.join(self.root_dir, step.script)),
+            'sources': {src: self.digest(os.path.join(self.root_dir, src)) for src in step.sources},
+            'inputs': {name: self.digest(self.artifact(name)) for name in step.inputs},
+            'params': step.params,
+            'outputs': step.outputs,
+        }
+        return hashlib.sha256(json.dumps(declared, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _outputs_current(self, step, record):
+        for name in step.outputs:
+            path = self.artifact(name)
+            if not os.path.exists(path) or self.digest(path) != record['outputs'].get(name):
+                return False
+        return True
+
+    # ========================================
+    # TASKS
+    # ========================================
+
+    def run_step(self, step):
+        fingerprint = self.fingerprint(step)
+        record = self.state['steps'].get(step.name)
+        if not self.force and record and record['fingerprint'] == fingerprint and self._outputs_current(step, record):
+            self.results[step.name] = 'unchanged'
+            return
+
+        start = time.perf_counter()
+        command = [sys.executable, os.path.join(self.root_dir, step.script)] + step.params
+        result = subprocess.run(command, cwd=self.build_dir, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"{step.script} exited with {result.returncode}: {result.stderr.strip()[-500:]}")
+        missing = [name for name in step.outputs if not os.path.exists(self.artifact(name))]
+        if missing:
+            raise RuntimeError(f"{step.script} did not produce {', '.join(missing)}")
+
+        outputs = {name: self.digest(self.artifact(name)) for name in step.outputs}
+        with self._lock:
+            self.state['steps'][step.name] = {'fingerprint': fingerprint, 'outputs': outputs}
+        self.results[step.name] = f"built in {time.perf_counter() - start:.2f}s"
+
+    def place(self, dest_dir, names):
+        """Hardlink artifacts into a project folder (copy where links are not possible)."""
+        os.makedirs(os.path.join(self.root_dir, dest_dir), exist_ok=True)
+        placed = 0
+        for name in names:
+            source = self.artifact(name)
+            dest = os.path.join(self.root_dir, dest_dir, name)
+            relative = f"{dest_dir}/{name}"
+            entry = self.state['placements'].get(relative)
+            if os.path.exists(dest):
+                if os.path.samefile(source, dest):
+                    continue
+                if entry and entry['mode'] == 'copy' and self.digest(dest) == self.digest(source):
+                    continue
+
+            temporary = dest + '.tmp'
+            try:
+                os.link(source, temporary)
+                mode = 'link'
+            except OSError:
+                shutil.copy2(source, temporary)
+                mode = 'copy'
+            os.replace(temporary, dest)
+            with self._lock:
+                self.state['placements'][relative] = {'source': name, 'sha256': self.digest(source), 'mode': mode}
+            placed += 1
+        self.results[f"place:{dest_dir}"] = f"{placed} placed" if placed else 'unchanged'
+
+    def build_schedule(self):
+        scheduler = DAGScheduler(self.max_workers)
+        producers = {name: step.name for step in self.steps.values() for name in step.outputs}
+        for step in self.steps.values():
+            depends_on = sorted({producers[name] for name in step.inputs if name in producers})
+            scheduler.add_task(step.name, lambda step=step: self.run_step(step), depends_on)
+        for dest_dir, names in self.placements.items():
+            depends_on = sorted({producers[name] for name in names})
+            scheduler.add_task(f"place:{dest_dir}", lambda d=dest_dir, n=names: self.place(d, n), depends_on)
+        return scheduler
+
+    def run(self):
+        """Bring every artifact up to date. Returns the scheduler of the run."""
+        os.makedirs(self.build_dir, exist_ok=True)
+        scheduler = self.build_schedule()
+        try:
+            scheduler.run()
+        finally:
+            # Keep the fingerprints of the steps that did succeed
+            self._save_state()
+        return scheduler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Regenerate the data artifacts whose inputs changed')
+    parser.add_argument('--root', default=ROOT_DIR, help='Repository root')
+    parser.add_argument('--build-dir', help='Folder for built artifacts (default: DW_Sales_Project/build)')
+    parser.add_argument('--force', action='store_true', help='Rebuild every step')
+    parser.add_argument('--workers', type=int, default=4, help='Maximum steps run in parallel')
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    pipeline = Pipeline(args.root, args.build_dir, force=args.force, max_workers=args.workers)
+    try:
+        scheduler = pipeline.run()
+    except (TaskFailedError, OSError) as e:
+        print(f"Pipeline failed: {e}")
+        return 1
+
+    for name, run in scheduler.runs.items():
+        print(f"{name:36s} {pipeline.results.get(name, run.status.lower())}")
+    print(f"Done in {time.perf_counter() - start:.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
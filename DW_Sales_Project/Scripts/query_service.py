@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Dashboard Query Service
+
+Small local HTTP/JSON service answering the named analysis queries from the warehouse
+(SQLite), so dashboard tiles stop querying the warehouse directly:
+
+  GET /queries                      names and accepted parameters
+  GET /query/<name>?start=YYYY-MM-DD&end=YYYY-MM-DD&region=...&channel=...
+
+Unfiltered requests read the aggregates.py rollups; filtered ones run against
+FactSales. Results are cached in a size-bounded LRU keyed on query, parameters and
+ETL generation (the LogID of the last COMPLETED ETL_ProcessLog row), so a finished
+ETL run invalidates the cache. Concurrent identical requests share one execution.
+
+--benchmark measures latency and throughput with a cold and a warm cache.
+"""
+
+import argparse
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from urllib.request import urlopen
+
+import aggregates
+
+
+PARAMETERS = ['start', 'end', 'region', 'channel']
+
+# FactSales versions of the dashboard queries, used when filters are given. Queries
+# listing a dimension keep its LEFT JOIN, with the filters in the ON clause ({on}),
+# so a filtered tile has the same rows as the unfiltered one.
+FILTERED_QUERIES = {
+    'sales_summary': """
+        SELECT COUNT(*) AS TotalTransactions, SUM(TotalAmount) AS TotalRevenue,
+               AVG(TotalAmount) AS AvgTransactionValue,
+               MIN(DateKey) AS FirstSale, MAX(DateKey) AS LastSale
+        FROM FactSales f {where}""",
+    'top_products': """
+        SELECT p.ProductName, p.Category, SUM(f.Quantity) AS TotalSold,
+               SUM(f.TotalAmount) AS Revenue, AVG(f.UnitPrice) AS AvgPrice
+        FROM FactSales f
+        JOIN DimProduct p ON p.ProductKey = f.ProductKey AND p.IsCurrent = 1
+        {where}
+        GROUP BY p.ProductKey, p.ProductName, p.Category
+        ORDER BY Revenue DESC
+        LIMIT 10""",
+    'monthly_trend': """
+        SELECT f.DateKey / 10000 AS Year, f.DateKey / 100 % 100 AS Month,
+               COUNT(*) AS TransactionCount, SUM(f.TotalAmount) AS MonthlyRevenue,
+               AVG(f.TotalAmount) AS AvgTransactionValue
+        FROM FactSales f {where}
+        GROUP BY Year, Month
+        ORDER BY Year, Month""",
+    'customer_lifetime_value': """
+        SELECT c.CustomerKey AS CustomerID, c.FullName, c.City, c.MembershipLevel,
+               COUNT(f.SalesKey) AS PurchaseCount, SUM(f.TotalAmount) AS TotalSpent,
+               AVG(f.TotalAmount) AS AvgOrderValue, MAX(f.DateKey) AS LastPurchase
+        FROM DimCustomer c
+        LEFT JOIN FactSales f ON f.CustomerKey = c.CustomerKey {on}
+        WHERE c.IsCurrent = 1
+        GROUP BY c.CustomerKey, c.FullName, c.City, c.MembershipLevel
+        ORDER BY TotalSpent DESC""",
+    'salesperson_performance': """
+        SELECT e.EmployeeKey AS EmployeeID, e.FullName, e.Department,
+               COUNT(f.SalesKey) AS SalesCount, SUM(f.TotalAmount) AS TotalSales,
+               AVG(f.TotalAmount) AS AvgSaleValue
+        FROM DimEmployee e
+        LEFT JOIN FactSales f ON f.EmployeeKey = e.EmployeeKey {on}
+        WHERE e.Department = 'Sales'
+        GROUP BY e.EmployeeKey, e.FullName, e.Department
+        ORDER BY TotalSales DESC""",
+    'region_channel': """
+        SELECT f.Region, f.SalesChannel, COUNT(*) AS TransactionCount,
+               SUM(f.TotalAmount) AS Revenue, AVG(f.TotalAmount) AS AvgValue
+        FROM FactSales f {where}
+        GROUP BY f.Region, f.SalesChannel
+        ORDER BY Revenue DESC""",
+    'category_performance': """
+        SELECT p.Category, COUNT(DISTINCT p.ProductKey) AS ProductCount,
+               COALESCE(SUM(f.Quantity), 0) AS TotalUnitsSold, SUM(f.TotalAmount) AS TotalRevenue,
+               AVG(f.TotalAmount) AS AvgSaleValue
+        FROM DimProduct p
+        LEFT JOIN FactSales f ON f.ProductKey = p.ProductKey {on}
+        WHERE p.IsCurrent = 1
+        GROUP BY p.Category
+        ORDER BY TotalRevenue DESC""",
+}
+
+
+def date_key(value):
+    """YYYYMMDD DateKey of a 'YYYY-MM-DD' parameter; ValueError if it is not a valid date."""
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD") from None
+    return day.year * 10000 + day.month * 100 + day.day
+
+
+def build_query(name, params):
+    """SQL and bind values for a named query and its (possibly empty) filters."""
+    if name not in aggregates.DASHBOARD_QUERIES:
+        raise KeyError(name)
+    if not params:
+        return aggregates.DASHBOARD_QUERIES[name], []
+
+    conditions, values = [], []
+    if 'start' in params:
+        conditions.append("f.DateKey >= ?")
+        values.append(date_key(params['start']))
+    if 'end' in params:
+        conditions.append("f.DateKey <= ?")
+        values.append(date_key(params['end']))
+    if 'region' in params:
+        conditions.append("f.Region = ?")
+        values.append(params['region'])
+    if 'channel' in params:
+        conditions.append("f.SalesChannel = ?")
+        values.append(params['channel'])
+    where = "WHERE " + " AND ".join(conditions)
+    on = "AND " + " AND ".join(conditions)
+    return FILTERED_QUERIES[name].format(where=where, on=on), values
+
+
+class QueryCache:
+    """LRU of serialized results bounded by total size in bytes."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            payload = self.entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key, payload):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key))
+            self.entries[key] = payload
+            self.size += len(payload)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.size = 0
+
+
+class QueryService:
+    def __init__(self, db_path, cache_bytes=64 * 1024 * 1024, generation_poll=1.0):
+        self.db_path = db_path
+        self.cache = QueryCache(cache_bytes)
+        self.generation_poll = generation_poll
+        self.generation = None
+        self._generation_checked = 0.0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        # ThreadingHTTPServer starts a thread per request, so connections are pooled, not thread-local
+        self._connections = queue.LifoQueue()
+
+    @contextmanager
+    def _connection(self):
+        try:
+            conn = self._connections.get_nowait()
+        except queue.Empty:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
+
+    def current_generation(self):
+        """LogID of the last completed ETL run, re-read at most every generation_poll seconds."""
+        now = time.monotonic()
+        if now - self._generation_checked >= self.generation_poll:
+            with self._connection() as conn:
+                row = conn.execute("SELECT MAX(LogID) FROM ETL_ProcessLog WHERE Status = 'COMPLETED'").fetchone()
+            self._generation_checked = now
+            if row[0] != self.generation:
+                # New data: drop results of the previous generation right away
+                self.generation = row[0]
+                self.cache.clear()
+        return self.generation
+
+    def _execute(self, name, params, generation):
+        sql, values = build_query(name, params)
+        with self._connection() as conn:
+            cursor = conn.execute(sql, values)
+            columns = [col[0] for col in cursor.description]
+            rows = cursor.fetchall()
+        return json.dumps({'query': name, 'params': params, 'generation': generation,
+                           'columns': columns, 'rows': rows}).encode('utf-8')
+
+    def run(self, name, params):
+        """JSON payload of a query and whether it came from the cache."""
+        params = {key: value for key, value in params.items() if key in PARAMETERS and value}
+        generation = self.current_generation()
+        key = (name, tuple(sorted(params.items())), generation)
+
+        payload = self.cache.get(key)
+        if payload is not None:
+            return payload, True
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not leader:
+            # Identical request already running: wait for its result
+            return future.result(), True
+
+        try:
+            payload = self._execute(name, params, generation)
+            self.cache.put(key, payload)
+            future.set_result(payload)
+            return payload, False
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+
+def make_handler(service):
+    class QueryHandler(BaseHTTPRequestHandler):
+        def _send(self, status, payload, cached=False):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.send_header('X-Cache', 'HIT' if cached else 'MISS')
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = url.path.strip('/').split('/')
+            if parts == ['queries']:
+                body = {'queries': list(aggregates.DASHBOARD_QUERIES), 'parameters': PARAMETERS}
+                self._send(200, json.dumps(body).encode('utf-8'))
+            elif len(parts) == 2 and parts[0] == 'query':
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                try:
+                    payload, cached = service.run(parts[1], params)
+                    self._send(200, payload, cached)
+                except KeyError:
+                    self._send(404, json.dumps({'error': f"Unknown query '{parts[1]}'"}).encode('utf-8'))
+                except (ValueError, sqlite3.Error) as e:
+                    self._send(400, json.dumps({'error': str(e)}).encode('utf-8'))
+            else:
+                self._send(404, json.dumps({'error': 'Not found'}).encode('utf-8'))
+
+        def log_message(self, format, *args):
+            pass
+
+    return QueryHandler
+
+
+class QueryServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 drops connections under a few concurrent clients
+    request_queue_size = 128
+
+
+def start_server(service, host='127.0.0.1', port=8050):
+    """Serve in a background thread. Returns the server (server_address has the real port)."""
+    server = QueryServer((host, port), make_handler(service))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ========================================
+# BENCHMARK
+# ========================================
+
+def _timed_get(url):
+    start = time.perf_counter()
+    with urlopen(url) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def _report(label, latencies, wall):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    print(f"{label:8s} {len(latencies):6d} requests  p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  "
+          f"{len(latencies) / wall:8.0f} req/s")
+
+
+def benchmark(db_path, requests=500, concurrency=8):
+    """Latency and throughput of every query: cold (cache cleared), warm, and warm with concurrent clients."""
+    service = QueryService(db_path)
+    server = start_server(service, port=0)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/query/{name}" for name in aggregates.DASHBOARD_QUERIES]
+    urls += [f"{base}/query/{name}?start=2024-01-01&end=2024-06-30&region=North"
+             for name in aggregates.DASHBOARD_QUERIES]
+    try:
+        cold = []
+        start = time.perf_counter()
+        for i in range(requests):
+            service.cache.clear()
+            cold.append(_timed_get(urls[i % len(urls)]))
+        _report('cold', cold, time.perf_counter() - start)
+
+        for url in urls:
+            _timed_get(url)
+        start = time.perf_counter()
+        warm = [_timed_get(urls[i % len(urls)]) for i in range(requests)]
+        _report('warm', warm, time.perf_counter() - start)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            start = time.perf_counter()
+            warm = list(executor.map(_timed_get, [urls[i % len(urls)] for i in range(requests)]))
+            _report(f'warm x{concurrency}', warm, time.perf_counter() - start)
+        print(f"cache: {service.cache.hits} hits, {service.cache.misses} misses, {service.cache.size:,} bytes")
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the dashboard queries over HTTP/JSON with a result cache')
+    parser.add_argument('warehouse', help='Warehouse database path (SQLite)')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8050, help='Port to listen on')
+    parser.add_argument('--cache-mb', type=float, default=64, help='Result cache size in MB')
+    parser.add_argument('--benchmark', action='store_true', help='Run the cold/warm cache benchmark and exit')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per benchmark phase')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients in the benchmark')
+
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.warehouse, args.requests, args.concurrency)
+        return 0
+
+    service = QueryService(args.warehouse, int(args.cache_mb * 1024 * 1024))
+    server = QueryServer((args.host, args.port), make_handler(service))
+    print(f"Serving dashboard queries on http://{args.host}:{args.port}/queries")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Dependency-Aware ETL Task Scheduler
+
+Runs ETL tasks as a DAG instead of the linear chain of SSIS precedence constraints:
+every task whose dependencies have finished is started on a thread pool (bounded by
+max_workers), the first failure cancels everything not yet started, and the timings
+of the run are reduced to its critical path.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class TaskFailedError(Exception):
+    """Raised when a task fails; the remaining tasks are cancelled."""
+
+    def __init__(self, task_name, error):
+        super().__init__(f"Task '{task_name}' failed: {error}")
+        self.task_name = task_name
+        self.error = error
+
+
+class TaskRun:
+    """Timing and outcome of one task execution."""
+
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+        self.end = None
+        self.status = 'PENDING'
+        self.error = None
+
+    @property
+    def duration(self):
+        if self.start is None or self.end is None:
+            return 0.0
+        return self.end - self.start
+
+
+class DAGScheduler:
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.tasks = {}
+        self.dependencies = {}
+        self.runs = {}
+        self.cancel_event = threading.Event()
+
+    def add_task(self, name, func, depends_on=()):
+        """Register a callable taking no arguments, to run after its dependencies."""
+        if name in self.tasks:
+            raise ValueError(f"Duplicate task: {name}")
+        self.tasks[name] = func
+        self.dependencies[name] = list(depends_on)
+
+    def _validate(self):
+        """Reject unknown dependencies and cycles."""
+        for name, deps in self.dependencies.items():
+            for dep in deps:
+                if dep not in self.tasks:
+                    raise ValueError(f"Task '{name}' depends on unknown task '{dep}'")
+
+        visiting, done = set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through task '{name}'")
+            visiting.add(name)
+            for dep in self.dependencies[name]:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.tasks:
+            visit(name)
+
+    def _execute(self, name):
+        run = self.runs[name]
+        run.status = 'RUNNING'
+        run.start = time.perf_counter()
+        try:
+            self.tasks[name]()
+            run.status = 'SUCCEEDED'
+        except Exception as e:
+            run.status = 'FAILED'
+            run.error = e
+            raise
+        finally:
+            run.end = time.perf_counter()
+
+    def run(self):
+        """Run every task, respecting dependencies. Returns the TaskRun of each task."""
+        self._validate()
+        self.cancel_event.clear()
+        self.runs = {name: TaskRun(name) for name in self.tasks}
+        remaining = set(self.tasks)
+        finished = set()
+        running = {}
+        failure = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while remaining or running:
+                if failure is None:
+                    ready = [name for name in sorted(remaining)
+                             if all(dep in finished for dep in self.dependencies[name])]
+                    # Only fill free workers: a queued future would still start after a failure
+                    for name in ready[:self.max_workers - len(running)]:
+                        remaining.discard(name)
+                        running[executor.submit(self._execute, name)] = name
+
+                if not running:
+                    break
+
+                completed, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    name = running.pop(future)
+                    if future.exception() is not None:
+                        if failure is None:
+                            failure = TaskFailedError(name, future.exception())
+                            # Fail fast: stop scheduling and signal tasks that poll the event
+                            self.cancel_event.set()
+                    else:
+                        finished.add(name)
+
+        for name in remaining:
+            self.runs[name].status = 'CANCELLED'
+        if failure is not None:
+            raise failure
+        return self.runs
+
+    def critical_path(self):
+        """Chain of tasks that bounded the last run, and its wall time in seconds."""
+        timed = [run for run in self.runs.values() if run.end is not None]
+        if not timed:
+            return [], 0.0
+
+        path = []
+        current = max(timed, key=lambda run: run.end)
+        while current is not None:
+            path.append(current.name)
+            # The dependency that finished last is the one the task was waiting on
+            deps = [self.runs[dep] for dep in self.dependencies[current.name] if self.runs[dep].end is not None]
+            current = max(deps, key=lambda run: run.end) if deps else None
+        path.reverse()
+
+        return path, self.runs[path[-1]].end - self.runs[path[0]].start
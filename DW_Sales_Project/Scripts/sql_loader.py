@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Streaming SQL Script Loader
+
+Executes SSMS/database_schema_and_data.sql (or any script of the same shape) against a
+DB-API connection without reading it whole. The script is split into statements in a
+single streaming pass that understands quoted strings and identifiers, '--' comments
+and nested '/* */' comments (the analysis queries at the end are one big comment).
+
+Multi-row INSERT ... VALUES statements are never held whole: their rows are cut out
+as they stream past and re-emitted as INSERTs of at most batch_rows rows, and the
+batches are committed every commit_rows rows. Memory depends on the batch size, not
+on the size of the script.
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import time
+
+from stage_metrics import MetricsRecorder
+
+
+DEFAULT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'SSMS',
+                              'database_schema_and_data.sql')
+
+# Characters that change the scanner state outside strings and comments
+_TOKEN = re.compile(r"""--|/\*|['"\[;(),]""")
+_BLOCK_COMMENT = re.compile(r"/\*|\*/")
+_QUOTE_END = {"'": "'", '"': '"', '[': ']'}
+_INSERT_VALUES = re.compile(r"\s*INSERT\b.*\bVALUES\s*$", re.IGNORECASE | re.DOTALL)
+
+
+class ScriptSplitter:
+    """Incremental statement splitter; feed() lines, get (sql, row_count) statements back.
+
+    row_count is the number of VALUES rows of an INSERT batch, 0 for other statements.
+    """
+
+    def __init__(self, batch_rows=1000):
+        self.batch_rows = batch_rows
+        self.parts = []
+        self.depth = 0
+        self.quote = None
+        self.comment_depth = 0
+        self.insert_prefix = None
+        self.rows = []
+        # True right after VALUES and after each ',' between rows: a row must come next
+        self.expect_row = False
+
+    def _flush_rows(self):
+        sql = f"{self.insert_prefix} {', '.join(self.rows)}"
+        count = len(self.rows)
+        self.rows = []
+        return sql, count
+
+    def _check_between_rows(self):
+        """Reject text between or after VALUES rows (ON CONFLICT, RETURNING, ...).
+
+        Earlier batches have already been emitted without it, so it cannot be applied.
+        """
+        text = ''.join(self.parts).strip()
+        if text:
+            raise ValueError(f"Unsupported text after the VALUES rows of '{self.insert_prefix[:60]}': {text[:60]}")
+        self.parts.clear()
+
+    def _end_statement(self):
+        if self.insert_prefix is not None:
+            self._check_between_rows()
+            if self.expect_row:
+                raise ValueError(f"Missing VALUES row at the end of '{self.insert_prefix[:60]}'")
+        text = ''.join(self.parts).strip()
+        self.parts.clear()
+        if self.insert_prefix is not None:
+            if self.rows:
+                yield self._flush_rows()
+            self.insert_prefix = None
+        elif text:
+            yield text, 0
+
+    def feed(self, line):
+        """Statements completed by this line."""
+        if not self.quote and not self.comment_depth and self.depth == 0 and line.strip().upper() == 'GO':
+            # T-SQL batch separator
+            yield from self._end_statement()
+            return
+
+        pos, parts = 0, self.parts
+        while pos < len(line):
+            if self.comment_depth:
+                match = _BLOCK_COMMENT.search(line, pos)
+                if match is None:
+                    return
+                self.comment_depth += 1 if match.group() == '/*' else -1
+                pos = match.end()
+                if not self.comment_depth:
+                    parts.append(' ')
+                continue
+
+            if self.quote:
+                closing = _QUOTE_END[self.quote]
+                end = line.find(closing, pos)
+                if end < 0:
+                    parts.append(line[pos:])
+                    return
+                if line.startswith(closing, end + 1):
+                    # Doubled quote: escaped, still inside the string
+                    parts.append(line[pos:end + 2])
+                    pos = end + 2
+                    continue
+                parts.append(line[pos:end + 1])
+                pos = end + 1
+                self.quote = None
+                continue
+
+            match = _TOKEN.search(line, pos)
+            if match is None:
+                parts.append(line[pos:])
+                return
+            parts.append(line[pos:match.start()])
+            token, pos = match.group(), match.end()
+
+            if token == '--':
+                parts.append('\n')
+                return
+            elif token == '/*':
+                self.comment_depth = 1
+            elif token in _QUOTE_END:
+                self.quote = token
+                parts.append(token)
+            elif token == '(':
+                if self.depth == 0 and self.insert_prefix is not None:
+                    self._check_between_rows()
+                    if not self.expect_row:
+                        raise ValueError(f"Missing ',' between the VALUES rows of '{self.insert_prefix[:60]}'")
+                elif self.depth == 0 and _INSERT_VALUES.match(''.join(parts)):
+                    self.insert_prefix = ''.join(parts).strip()
+                    parts.clear()
+                    self.expect_row = True
+                self.depth += 1
+                parts.append(token)
+            elif token == ')':
+                self.depth -= 1
+                parts.append(token)
+                if self.depth == 0 and self.insert_prefix is not None:
+                    # One complete VALUES row
+                    self.rows.append(''.join(parts).strip())
+                    parts.clear()
+                    self.expect_row = False
+                    if len(self.rows) >= self.batch_rows:
+                        yield self._flush_rows()
+            elif token == ',':
+                if self.depth > 0 or self.insert_prefix is None:
+                    parts.append(token)
+                else:
+                    self._check_between_rows()
+                    if self.expect_row:
+                        raise ValueError(f"Missing VALUES row before ',' in '{self.insert_prefix[:60]}'")
+                    self.expect_row = True
+            else:  # ';'
+                yield from self._end_statement()
+
+    def close(self):
+        """Statement left unterminated at the end of the script, if any."""
+        if self.quote:
+            raise ValueError(f"Unterminated {self.quote} quoted text at end of script")
+        if self.comment_depth:
+            raise ValueError("Unterminated /* comment at end of script")
+        yield from self._end_statement()
+
+
+def iter_statements(lines, batch_rows=1000):
+    """(sql, row_count) for every statement of a script given as an iterable of lines."""
+    splitter = ScriptSplitter(batch_rows)
+    for line in lines:
+        yield from splitter.feed(line)
+    yield from splitter.close()
+
+
+class LoadStats:
+    def __init__(self):
+        self.statements = 0
+        self.rows = 0
+        self.commits = 0
+
+
+def load_script(conn, path, batch_rows=1000, commit_rows=50000, progress=None):
+    """Execute a script against a DB-API connection, committing every commit_rows inserted rows.
+
+    Other statements (DDL) are committed as they run. progress, if given, is called
+    with the running LoadStats after every commit.
+    """
+    stats = LoadStats()
+    pending = 0
+    cursor = conn.cursor()
+    try:
+        with open(path, encoding='utf-8') as f:
+            for sql, rows in iter_statements(f, batch_rows):
+                cursor.execute(sql)
+                stats.statements += 1
+                stats.rows += rows
+                pending += rows
+                if rows == 0 or pending >= commit_rows:
+                    conn.commit()
+                    stats.commits += 1
+                    pending = 0
+                    if progress is not None:
+                        progress(stats)
+        conn.commit()
+        stats.commits += 1
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Execute a generated SQL script in bounded, batched transactions')
+    parser.add_argument('database', help='Target database path (SQLite)')
+    parser.add_argument('--script', default=DEFAULT_SCRIPT, help='SQL script to execute')
+    parser.add_argument('--batch-rows', type=int, default=1000, help='Maximum rows per INSERT statement')
+    parser.add_argument('--commit-rows', type=int, default=50000, help='Rows per transaction')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Also report the Python heap peak (tracemalloc)')
+
+    args = parser.parse_args()
+
+    recorder = MetricsRecorder(trace_memory_stages=['LoadScript'] if args.trace_memory else ())
+    conn = sqlite3.connect(args.database)
+    start = time.perf_counter()
+
+    def progress(stats):
+        if stats.rows:
+            seconds = time.perf_counter() - start
+            print(f"  {stats.rows:,} rows, {stats.rows / seconds:,.0f} rows/s")
+
+    try:
+        with recorder.stage('LoadScript') as metrics:
+            stats = load_script(conn, args.script, args.batch_rows, args.commit_rows, progress)
+            metrics.rows_written = stats.rows
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Load failed: {e}")
+        return 1
+    finally:
+        conn.close()
+
+    print(f"{stats.statements} statements, {stats.rows:,} rows, {stats.commits} commits "
+          f"in {metrics.wall_seconds:.2f}s ({metrics.rows_per_second:,.0f} rows/s)")
+    if metrics.peak_memory_mb is not None:
+        print(f"RSS {metrics.rss_start_mb:.1f} MB -> {metrics.rss_end_mb:.1f} MB, peak {metrics.peak_memory_mb:.1f} MB")
+    if metrics.heap_peak_mb is not None:
+        print(f"Python heap peak {metrics.heap_peak_mb:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+ETL Stage Metrics
+
+Per-stage instrumentation for the Python ETL. Every stage records rows read, written
+and rejected, wall and CPU time, throughput, the process RSS at its start and end and
+its peak RSS, sampled from a background thread while the stage runs (plus the Python
+heap peak for stages traced with tracemalloc). The results are stored
+in ETL_StageMetrics next to the ETL_ProcessLog row of the run and exported as JSON
+and Prometheus text files for trending.
+
+cProfile and tracemalloc can be switched on for individual stages; profiles are
+written to <metrics_dir>/<LogID>_<stage>.prof.
+"""
+
+import cProfile
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+METRIC_FIELDS = [
+    ('rows_read', 'RowsRead', 'Rows read by the stage'),
+    ('rows_written', 'RowsWritten', 'Rows written by the stage'),
+    ('rows_rejected', 'RowsRejected', 'Rows rejected by the stage'),
+    ('wall_seconds', 'WallSec', 'Wall-clock time of the stage in seconds'),
+    ('cpu_seconds', 'CpuSec', 'CPU time of the stage thread in seconds'),
+    ('rows_per_second', 'RowsPerSec', 'Rows processed per wall-clock second'),
+    ('peak_memory_mb', 'PeakMemoryMB', 'Peak resident set size of the process during the stage in MB'),
+    ('rss_start_mb', 'RssStartMB', 'Resident set size of the process when the stage started in MB'),
+    ('rss_end_mb', 'RssEndMB', 'Resident set size of the process when the stage ended in MB'),
+    ('heap_peak_mb', 'HeapPeakMB', 'Peak Python heap of the stage in MB (tracemalloc, traced stages only)'),
+]
+
+
+def _current_rss_mb():
+    """Current (not peak) resident set size of the process, or None where unavailable."""
+    if resource is None:
+        return None
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * resource.getpagesize() / (1024 * 1024)
+
+
+class RssSampler:
+    """Peak RSS over a block of code, sampled every interval seconds from a daemon thread."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak_mb = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def _sample(self):
+        rss = _current_rss_mb()
+        if rss is not None and (self.peak_mb is None or rss > self.peak_mb):
+            self.peak_mb = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._sample()
+        if self.peak_mb is not None:
+            self._thread.start()
+
+    def stop(self):
+        """Stop sampling and return the peak in MB (None where RSS is unavailable)."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._sample()
+        return self.peak_mb
+
+
+class StageMetrics:
+    """Counters and timings of one ETL stage."""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.rows_read = 0
+        self.rows_written = 0
+        self.rows_rejected = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_memory_mb = None
+        self.rss_start_mb = None
+        self.rss_end_mb = None
+        self.heap_peak_mb = None
+
+    @property
+    def rows_per_second(self):
+        rows = max(self.rows_read, self.rows_written)
+        return rows / self.wall_seconds if self.wall_seconds > 0 else 0.0
+
+    def as_dict(self):
+        return {'stage': self.stage, **{attr: getattr(self, attr) for attr, _, _ in METRIC_FIELDS}}
+
+
+class MetricsRecorder:
+    def __init__(self, metrics_dir=None, profile_stages=(), trace_memory_stages=(), sample_interval=0.01):
+        self.metrics_dir = metrics_dir
+        self.sample_interval = sample_interval
+        self.profile_stages = set(profile_stages)
+        self.trace_memory_stages = set(trace_memory_stages)
+        self.stages = []
+        self.log_id = None
+        self._lock = threading.Lock()
+        self._traced_stages = 0
+        self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name):
+        """Measure the enclosed block; the yielded StageMetrics takes the row counts."""
+        metrics = StageMetrics(name)
+        profiler = cProfile.Profile() if name in self.profile_stages else None
+        trace_memory = name in self.trace_memory_stages
+        if trace_memory:
+            with self._lock:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self._started_tracing = True
+                self._traced_stages += 1
+            tracemalloc.reset_peak()
+
+        # Current RSS before, after and sampled in between: ru_maxrss is a process
+        # high-water mark and cannot tell stages apart (stages running in parallel still
+        # share the process RSS)
+        metrics.rss_start_mb = _current_rss_mb()
+        sampler = RssSampler(self.sample_interval)
+        sampler.start()
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield metrics
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            metrics.wall_seconds = time.perf_counter() - wall_start
+            metrics.cpu_seconds = time.thread_time() - cpu_start
+            metrics.peak_memory_mb = sampler.stop()
+            metrics.rss_end_mb = _current_rss_mb()
+            if trace_memory:
+                # Python heap peak; tracemalloc is process wide, so parallel stages overlap
+                metrics.heap_peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                with self._lock:
+                    self._traced_stages -= 1
+                    if self._traced_stages == 0 and self._started_tracing:
+                        # No tracing overhead for the stages that follow
+                        tracemalloc.stop()
+                        self._started_tracing = False
+            if profiler is not None:
+                self._dump_profile(name, profiler)
+            with self._lock:
+                self.stages.append(metrics)
+
+    def _dump_profile(self, name, profiler):
+        if not self.metrics_dir:
+            return
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', name)
+        profiler.dump_stats(os.path.join(self.metrics_dir, f"{self.log_id or 0}_{safe_name}.prof"))
+
+    def save(self, conn, log_id):
+        """Store the recorded stages in ETL_StageMetrics."""
+        columns = ['LogID', 'StageName'] + [column for _, column, _ in METRIC_FIELDS]
+        conn.executemany(
+            f"INSERT OR REPLACE INTO ETL_StageMetrics ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            [(log_id, m.stage) + tuple(getattr(m, attr) for attr, _, _ in METRIC_FIELDS)
+             for m in self.stages])
+        conn.commit()
+
+    def export_json(self, path):
+        """Write the recorded stages as a JSON document."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'log_id': self.log_id, 'stages': [m.as_dict() for m in self.stages]}, f, indent=2)
+
+    def export_prometheus(self, path):
+        """Write the recorded stages in the Prometheus text exposition format."""
+        lines = []
+        for attr, _, help_text in METRIC_FIELDS:
+            metric = f"etl_stage_{attr}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            for m in self.stages:
+                value = getattr(m, attr)
+                if value is not None:
+                    lines.append(f'{metric}{{stage="{m.stage}",log_id="{self.log_id}"}} {value}')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def export(self):
+        """Write the JSON and Prometheus files of the run into metrics_dir."""
+        if not self.metrics_dir:
+            return
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        self.export_json(os.path.join(self.metrics_dir, f"etl_metrics_{self.log_id}.json"))
+        # Fixed name so a textfile collector always scrapes the latest run
+        self.export_prometheus(os.path.join(self.metrics_dir, 'etl_metrics.prom'))
+
+    def summary(self):
+        """One line per stage, for the console."""
+        return [f"{m.stage}: {m.rows_read} read, {m.rows_written} written, {m.rows_rejected} rejected, "
+                f"{m.wall_seconds:.3f}s wall, {m.cpu_seconds:.3f}s cpu, {m.rows_per_second:,.0f} rows/s"
+                for m in sorted(self.stages, key=lambda m: m.stage)]
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Warehouse Schema and Connection Helpers
+
+Local (SQLite) mirror of the TechMartDW star schema populated by the SSIS package,
+plus the ETL_ProcessLog bookkeeping done by the 'SQL - Start Process Logging',
+'SQL - Update Success Log' and 'SQL - Log Error' tasks.
+"""
+
+import sqlite3
+from datetime import datetime
+
+
+PROCESS_NAME = 'DataWarehouse_Load'
+
+FACT_COLUMNS = ['SalesKey', 'DateKey', 'CustomerKey', 'ProductKey', 'EmployeeKey', 'SupplierKey',
+                'Quantity', 'UnitPrice', 'Discount', 'TotalAmount', 'Revenue',
+                'SalesChannel', 'PaymentMethod', 'Region']
+
+WAREHOUSE_DDL = [
+    """CREATE TABLE IF NOT EXISTS DimDate (
+        DateKey INT PRIMARY KEY,
+        Date DATE NOT NULL,
+        Year INT,
+        Quarter INT,
+        Month INT,
+        Day INT,
+        MonthName VARCHAR(20),
+        DayName VARCHAR(20),
+        WeekOfYear INT,
+        IsWeekend BOOLEAN,
+        ISOYear INT,
+        DayOfWeek INT,
+        FiscalYear INT,
+        FiscalQuarter INT,
+        FiscalPeriod INT,
+        IsHoliday BOOLEAN
+    )""",
+    """CREATE TABLE IF NOT EXISTS DimCustomer (
+        CustomerKey VARCHAR(20) NOT NULL,
+        FullName VARCHAR(100),
+        Email VARCHAR(100),
+        City VARCHAR(50),
+        SignupDate DATE,
+        Status VARCHAR(20),
+        MembershipLevel VARCHAR(20),
+        RowHash CHAR(40) NOT NULL,
+        ValidFrom DATETIME NOT NULL,
+        ValidTo DATETIME,
+        IsCurrent BOOLEAN NOT NULL DEFAULT 1,
+        PRIMARY KEY (CustomerKey, ValidFrom)
+    )""",
+    """CREATE TABLE IF NOT EXISTS DimProduct (
+        ProductKey VARCHAR(20) NOT NULL,
+        ProductName VARCHAR(200),
+        Category VARCHAR(50),
+        Supplier VARCHAR(100),
+        UnitPrice DECIMAL(10,2),
+        MinStockLevel INT,
+        Weight_kg DECIMAL(5,2),
+        Dimensions VARCHAR(50),
+        WarrantyMonths INT,
+        RowHash CHAR(40) NOT NULL,
+        ValidFrom DATETIME NOT NULL,
+        ValidTo DATETIME,
+        IsCurrent BOOLEAN NOT NULL DEFAULT 1,
+        PRIMARY KEY (ProductKey, ValidFrom)
+    )""",
+    """CREATE TABLE IF NOT EXISTS DimEmployee (
+        EmployeeKey VARCHAR(20) PRIMARY KEY,
+        FullName VARCHAR(100),
+        Email VARCHAR(100),
+        Department VARCHAR(50),
+        Position VARCHAR(50),
+        RowHash CHAR(40) NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS DimSupplier (
+        SupplierKey VARCHAR(20) PRIMARY KEY,
+        CompanyName VARCHAR(100),
+        Country VARCHAR(50),
+        PaymentTerms VARCHAR(20),
+        Rating DECIMAL(2,1),
+        YearsPartnership INT,
+        RowHash CHAR(40) NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS FactSales (
+        SalesKey INT PRIMARY KEY,
+        DateKey INT,
+        CustomerKey VARCHAR(20),
+        ProductKey VARCHAR(20),
+        EmployeeKey VARCHAR(20),
+        SupplierKey VARCHAR(20),
+        Quantity INT,
+        UnitPrice DECIMAL(10,2),
+        Discount DECIMAL(3,2),
+        TotalAmount DECIMAL(10,2),
+        Revenue DECIMAL(12,2),
+        SalesChannel VARCHAR(20),
+        PaymentMethod VARCHAR(20),
+        Region VARCHAR(20)
+    )""",
+    """CREATE TABLE IF NOT EXISTS ETL_ProcessLog (
+        LogID INTEGER PRIMARY KEY AUTOINCREMENT,
+        ProcessName NVARCHAR(100) NOT NULL,
+        StartTime DATETIME NOT NULL,
+        EndTime DATETIME,
+        Status NVARCHAR(20) NOT NULL,
+        ErrorMessage TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS ETL_State (
+        TableName VARCHAR(50) PRIMARY KEY,
+        Watermark INT,
+        RowsLoaded INT,
+        LastLogID INT,
+        UpdatedAt DATETIME
+    )""",
+    """CREATE TABLE IF NOT EXISTS ETL_TaskRuns (
+        LogID INT NOT NULL,
+        TaskName VARCHAR(100) NOT NULL,
+        Status VARCHAR(20) NOT NULL,
+        DurationSec DECIMAL(12,3),
+        OffsetSec DECIMAL(12,3),
+        OnCriticalPath BOOLEAN NOT NULL DEFAULT 0,
+        ErrorMessage TEXT,
+        PRIMARY KEY (LogID, TaskName)
+    )""",
+    """CREATE TABLE IF NOT EXISTS ETL_StageMetrics (
+        LogID INT NOT NULL,
+        StageName VARCHAR(100) NOT NULL,
+        RowsRead INT,
+        RowsWritten INT,
+        RowsRejected INT,
+        WallSec DECIMAL(12,3),
+        CpuSec DECIMAL(12,3),
+        RowsPerSec DECIMAL(14,2),
+        PeakMemoryMB DECIMAL(12,2),
+        RssStartMB DECIMAL(12,2),
+        RssEndMB DECIMAL(12,2),
+        HeapPeakMB DECIMAL(12,2),
+        PRIMARY KEY (LogID, StageName)
+    )""",
+    # Dashboard rollups, maintained incrementally by aggregates.py
+    """CREATE TABLE IF NOT EXISTS AggSalesSummary (
+        SummaryKey INT PRIMARY KEY,
+        TransactionCount INT NOT NULL,
+        Revenue DECIMAL(18,2) NOT NULL,
+        FirstDateKey INT,
+        LastDateKey INT
+    )""",
+    """CREATE TABLE IF NOT EXISTS AggSalesMonthly (
+        Year INT NOT NULL,
+        Month INT NOT NULL,
+        TransactionCount INT NOT NULL,
+        Revenue DECIMAL(18,2) NOT NULL,
+        PRIMARY KEY (Year, Month)
+    )""",
+    """CREATE TABLE IF NOT EXISTS AggSalesRegionChannel (
+        Region VARCHAR(20) NOT NULL,
+        SalesChannel VARCHAR(20) NOT NULL,
+        TransactionCount INT NOT NULL,
+        Revenue DECIMAL(18,2) NOT NULL,
+        PRIMARY KEY (Region, SalesChannel)
+    )""",
+    """CREATE TABLE IF NOT EXISTS AggSalesCategory (
+        Category VARCHAR(50) NOT NULL PRIMARY KEY,
+        TransactionCount INT NOT NULL,
+        UnitsSold INT NOT NULL,
+        Revenue DECIMAL(18,2) NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS AggSalesProduct (
+        ProductKey VARCHAR(20) NOT NULL PRIMARY KEY,
+        TransactionCount INT NOT NULL,
+        UnitsSold INT NOT NULL,
+        Revenue DECIMAL(18,2) NOT NULL,
+        UnitPriceSum DECIMAL(18,2) NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS AggSalesCustomer (
+        CustomerKey VARCHAR(20) NOT NULL PRIMARY KEY,
+        PurchaseCount INT NOT NULL,
+        TotalSpent DECIMAL(18,2) NOT NULL,
+        LastDateKey INT
+    )""",
+    """CREATE TABLE IF NOT EXISTS AggSalesEmployee (
+        EmployeeKey VARCHAR(20) NOT NULL PRIMARY KEY,
+        SalesCount INT NOT NULL,
+        TotalSales DECIMAL(18,2) NOT NULL
+    )""",
+]
+
+
+def connect(db_path, timeout=60):
+    """Open a warehouse connection and make sure the schema exists."""
+    # Parallel ETL tasks each hold their own connection and wait on the write lock
+    conn = sqlite3.connect(db_path, timeout=timeout)
+    create_schema(conn)
+    return conn
+
+
+def create_schema(conn):
+    """Create the warehouse tables if they are missing."""
+    for statement in WAREHOUSE_DDL:
+        conn.execute(statement)
+    conn.commit()
+
+
+def now():
+    """Timestamp in the format stored in the DATETIME columns."""
+    return datetime.now().isoformat(sep=' ', timespec='seconds')
+
+
+def start_process_log(conn, process_name=PROCESS_NAME):
+    """Insert a STARTED row into ETL_ProcessLog and return its LogID."""
+    cursor = conn.execute(
+        "INSERT INTO ETL_ProcessLog (ProcessName, StartTime, Status) VALUES (?, ?, 'STARTED')",
+        (process_name, now()))
+    conn.commit()
+    return cursor.lastrowid
+
+
+def complete_process_log(conn, log_id):
+    """Mark a logged run as COMPLETED."""
+    conn.execute(
+        "UPDATE ETL_ProcessLog SET Status = 'COMPLETED', EndTime = ? WHERE LogID = ?",
+        (now(), log_id))
+    conn.commit()
+
+
+def fail_process_log(conn, log_id, message):
+    """Mark a logged run as FAILED with the error that stopped it."""
+    conn.rollback()
+    conn.execute(
+        "UPDATE ETL_ProcessLog SET Status = 'FAILED', EndTime = ?, ErrorMessage = ? WHERE LogID = ?",
+        (now(), message, log_id))
+    conn.commit()
+
+
+def log_task_runs(conn, log_id, runs, critical_path):
+    """Record the per-task timings of a scheduled run in ETL_TaskRuns."""
+    starts = [run.start for run in runs.values() if run.start is not None]
+    origin = min(starts) if starts else 0.0
+    conn.executemany(
+        """INSERT OR REPLACE INTO ETL_TaskRuns
+           (LogID, TaskName, Status, DurationSec, OffsetSec, OnCriticalPath, ErrorMessage)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        [(log_id, run.name, run.status, round(run.duration, 3),
+          round(run.start - origin, 3) if run.start is not None else None,
+          run.name in critical_path, str(run.error) if run.error else None)
+         for run in runs.values()])
+    conn.commit()